@@ -16,12 +16,37 @@
 # pip install torchdata
 
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
 
 import fsspec
-from torchdata.datapipes.iter import FSSpecFileLister, FSSpecFileOpener
+from torchdata.datapipes.iter import FSSpecFileLister
 from tos import EnvCredentialsProvider
 
-fsspec.register_implementation("tos", "tosfs.TosFileSystem", )
+
+def read_concurrently(paths, fs, window=16):
+    """Read the files with a rolling window of concurrent GETs.
+
+    Up to ``window`` files are read at the same time over separate connections
+    and yielded in arrival order, so a slow request does not stall the others.
+    A new read is submitted each time one completes, which avoids sending the
+    requests in bursts. The consumer receives the file content, all the blocking
+    TOS reads happen off the main thread. For multi-worker loading, torchdata
+    also provides ``datapipe.prefetch(n)`` and ``datapipe.sharding_filter()``.
+    """
+    paths = iter(paths)
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        in_flight = {
+            executor.submit(fs.cat_file, path): path for path in islice(paths, window)
+        }
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = in_flight.pop(future)
+                yield path, future.result()
+                for next_path in islice(paths, 1):
+                    in_flight[executor.submit(fs.cat_file, next_path)] = next_path
+
 
 if __name__ == '__main__':
 
@@ -31,9 +56,11 @@ if __name__ == '__main__':
         'region': 'cn-beijing'
     }
 
+    root = 'tos://your-bucket/your-dataset/'
+    fs, _ = fsspec.core.url_to_fs(root, **kwargs)
+
     # iterable-style datasets
-    file_lister = FSSpecFileLister(root='tos://your-bucket/your-dataset/', **kwargs)
-    iterable_dataset = FSSpecFileOpener(file_lister, mode="rb", **kwargs)
+    file_lister = FSSpecFileLister(root=root, **kwargs)
 
-    for _, item in iterable_dataset:
-        data = item.read()
+    for _, data in read_concurrently(file_lister, fs, window=16):
+        pass
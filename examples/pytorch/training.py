@@ -20,7 +20,6 @@
 import os
 import time
 
-import fsspec
 import lightning as L
 import torch
 import torchvision
@@ -28,8 +27,6 @@ from PIL import Image
 from torchdata.datapipes.iter import FSSpecFileLister, FSSpecFileOpener
 from tos import EnvCredentialsProvider
 
-fsspec.register_implementation("tos", "tosfs.TosFileSystem")
-
 class VisionModel(L.LightningModule):
     def __init__(
             self,
@@ -12,6 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from tosfs.core import TosFile, TosFileSystem
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from tosfs.core import TosFile, TosFileSystem
 
 __all__ = ["TosFileSystem", "TosFile"]
+
+
+def __getattr__(name: str) -> Any:
+    """Import the core module lazily, on the first access of its classes."""
+    if name in __all__:
+        # deferred on purpose, importing core pulls in the TOS SDK and fsspec
+        from tosfs import core  # noqa: PLC0415
+
+        return getattr(core, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -13,18 +13,26 @@
 # limitations under the License.
 
 """The compatible module about AbstractFileSystem in fsspec."""
+import functools
 import os
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Optional, Union
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from operator import itemgetter
+from typing import Any, List, Optional, Sequence, Tuple, Union
 
 from fsspec import AbstractFileSystem
 from fsspec.implementations.local import LocalFileSystem
 from fsspec.utils import other_paths
 
+from tosfs.consts import WALK_OPERATION_DEFAULT_MAX_WORKERS
+from tosfs.utils import SharedThreadPool
+
 magic_check_bytes = re.compile(b"([*?[])")
 magic_check = re.compile("([*?[])")
 
+_name_and_type = itemgetter("name", "type")
+
 
 def has_magic(s: str) -> bool:
     """Check if a string has glob characters."""
@@ -101,12 +109,19 @@ class FsspecCompatibleFS(AbstractFileSystem):
     Used to be compatible with old version in some special methods.
     """
 
+    # the pool the concurrent listings run on, set up by the subclass
+    _listing_executor: SharedThreadPool
+
     def walk(  # noqa
         self,
         path: str,
         maxdepth: Optional[int] = None,
         topdown: bool = True,
         on_error: str = "omit",
+        *,
+        detail: bool = False,
+        max_workers: int = WALK_OPERATION_DEFAULT_MAX_WORKERS,
+        shards: Optional[Sequence[str]] = None,
         **kwargs: Any,
     ) -> Any:
         """Return all files belows path.
@@ -141,79 +156,162 @@ class FsspecCompatibleFS(AbstractFileSystem):
             if omit (default), path with exception will simply be empty;
             If raise, an underlying exception will be raised;
             if callable, it will be called with a single OSError instance as argument
+        detail: bool (False)
+            If True, yield the infos of the dirs and files keyed by their names,
+            else just their names.
+        max_workers: int (16)
+            The maximum number of directories listed concurrently, bound by
+            the size of the listing pool shared by the filesystem.
+        shards: list of str, optional
+            If given, every directory is listed with one concurrent request per
+            name prefix shard, see ``_ls_parallel``.
         kwargs: passed to ``ls``
 
         """
         # type: ignore
         if maxdepth is not None and maxdepth < 1:
             raise ValueError("maxdepth must be at least 1")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
 
         path = self._strip_protocol(path)
-        full_dirs = {}
-        dirs = {}
-        files = {}
-
-        detail = kwargs.pop("detail", False)
+        # bind the listing arguments once, they are the same for every directory
+        if shards:
+            _list = functools.partial(self._ls_parallel, shards=shards, **kwargs)
+        else:
+            _list = functools.partial(self.ls, detail=True, **kwargs)
+
+        # Directories are listed concurrently in a breadth-first manner, so the
+        # total latency is bound by the depth of the tree rather than the
+        # number of directories.
+        bottom_up_results = []
+        # every directory is listed once, even if a caller adds it to dirs again
+        visited = {path}
+        # at most max_workers directories in flight on the shared listing pool
+        queued = deque([(path, maxdepth)])
+        pending: dict = {}
         try:
-            listing = self.ls(path, detail=True, **kwargs)
-        except (FileNotFoundError, OSError) as e:
-            if on_error == "raise":
-                raise
-            elif callable(on_error):
-                on_error(e)
-            if detail:
-                return path, {}, {}  # type: ignore
-            return path, [], []  # type: ignore
+            while queued or pending:
+                while queued and len(pending) < max_workers:
+                    cur_path, cur_depth = queued.popleft()
+                    future = self._listing_executor.submit(_list, cur_path)
+                    pending[future] = (cur_path, cur_depth)
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    cur_path, cur_depth = pending.pop(future)
+                    try:
+                        listing = future.result()
+                    except (FileNotFoundError, OSError) as e:
+                        if on_error == "raise":
+                            raise
+                        elif callable(on_error):
+                            on_error(e)
+                        continue
+
+                    full_dirs, dirs, files = self._classify_listing(
+                        listing, cur_path, detail
+                    )
+                    if topdown:
+                        # Yield before descending if walking top down, the
+                        # caller is allowed to prune ``dirs`` in-place.
+                        yield cur_path, dirs, files
+                    else:
+                        bottom_up_results.append((cur_path, dirs, files))
+
+                    if cur_depth is not None:
+                        cur_depth -= 1
+                        if cur_depth < 1:
+                            continue
+
+                    for d in dirs:
+                        child_path = full_dirs[d]
+                        if child_path in visited:
+                            continue
+                        visited.add(child_path)
+                        queued.append((child_path, cur_depth))
+        finally:
+            for future in pending:
+                future.cancel()
 
+        if not topdown:
+            # A directory is always listed after its parent, so the reversed
+            # listing order yields every directory after all its descendants.
+            yield from reversed(bottom_up_results)
+
+    @staticmethod
+    def _classify_listing(
+        listing: List[dict], path: str, detail: bool = True
+    ) -> Tuple[dict, Union[dict, List[str]], Union[dict, List[str]]]:
+        """Split the listing of a directory into its sub-directories and files.
+
+        Returns the full paths of the sub-directories keyed by the entry name,
+        then the sub-directories and the files, either as infos keyed by the
+        entry name if detail is True, or as lists of entry names.
+        """
+        full_dirs: dict = {}
+        dir_infos: dict = {}
+        file_infos: dict = {}
+        dir_names: List[str] = []
+        file_names: List[str] = []
+        seen_file_names = set()
         for info in listing:
+            raw_name, info_type = _name_and_type(info)
             # each info name must be at least [path]/part , but here
             # we check also for names like [path]/part/
-            pathname = info["name"].rstrip("/")  # type: ignore
-            name = pathname.rsplit("/", 1)[-1]
-            if info["type"] == "directory" and pathname != path:  # type: ignore
+            pathname = raw_name.removesuffix("/")
+            name = pathname[pathname.rfind("/") + 1 :]
+            if info_type == "directory" and pathname != path:
                 # do not include "self" path
+                if detail:
+                    dir_infos[name] = info
+                elif name not in full_dirs:
+                    dir_names.append(name)
                 full_dirs[name] = pathname
-                dirs[name] = info
-            elif pathname == path:
+                continue
+
+            if pathname == path:
                 # file-like with same name as give path
-                files[""] = info
-            else:
-                files[name] = info
+                name = ""
+            if detail:
+                file_infos[name] = info
+            elif name not in seen_file_names:
+                seen_file_names.add(name)
+                file_names.append(name)
+
+        if detail:
+            return full_dirs, dir_infos, file_infos
+        return full_dirs, dir_names, file_names
+
+    def _ls_parallel(
+        self, path: str, shards: Sequence[str], **kwargs: Any
+    ) -> List[dict]:
+        """List a directory by fanning out one listing per name prefix shard.
+
+        It requires the ``ls`` of the backend to accept a ``prefix`` keyword which
+        restricts the listing to the entries whose names start with
+        ``{path}/{prefix}``, that's true for TOS and other S3-compatible stores.
+        The shards must cover all the entry names under the path (e.g. all the
+        leading characters used by the dataset), otherwise entries are missed.
 
-        if not detail:
-            dirs = list(dirs)  # type: ignore
-            files = list(files)  # type: ignore
-
-        if topdown:
-            # Yield before recursion if walking top down
-            yield path, dirs, files
-
-        if maxdepth is not None:
-            maxdepth -= 1
-            if maxdepth < 1:
-                if not topdown:
-                    yield path, dirs, files
-                return
-
-        with ThreadPoolExecutor() as executor:
-            futures = {
-                executor.submit(
-                    self.walk,
-                    full_dirs[d],
-                    maxdepth=maxdepth,
-                    detail=detail,
-                    topdown=topdown,
-                    **kwargs,
-                ): d
-                for d in dirs
-            }
-            for future in as_completed(futures):
-                for result in future.result():
-                    yield result
+        Parameters
+        ----------
+        path: str
+            The directory to list.
+        shards: list of str
+            The name prefixes to list concurrently.
+        **kwargs: Any
+            Additional arguments passed to ``ls``.
 
-        if not topdown:
-            # Yield after recursion if walking bottom up
-            yield path, dirs, files
+        """
+        merged: dict = {}
+        for listing in self._listing_executor.map(
+            lambda shard: self.ls(path, detail=True, prefix=shard, **kwargs),
+            shards,
+        ):
+            for info in listing:
+                merged.setdefault(info["name"], info)
+
+        return list(merged.values())
 
     def find(  # noqa #
         self,
@@ -242,26 +340,34 @@ class FsspecCompatibleFS(AbstractFileSystem):
         """
         # TODO: allow equivalent of -name parameter
         path = self._strip_protocol(path)
-        out = {}
+        out = []
+
+        # A single lookup of the root tells whether there is anything to walk,
+        # walk works on directories, but find should also return [path]
+        # when path happens to be a file
+        try:
+            root_info = self.info(path)
+        except FileNotFoundError:
+            return {} if detail else []
+        if root_info["type"] != "directory":
+            return {path: root_info} if detail else [path]
 
         # Add the root directory if withdirs is requested
         # This is needed for posix glob compliance
-        if withdirs and path != "" and self.isdir(path):
-            out[path] = self.info(path)
+        if withdirs and path != "":
+            out.append((path, root_info))
 
-        for _, dirs, files in super().walk(path, maxdepth, detail=True, **kwargs):
+        for _, dirs, files in self.walk(path, maxdepth, detail=True, **kwargs):
+            out.extend((info["name"], info) for info in files.values())
             if withdirs:
-                files.update(dirs)
-            out.update({info["name"]: info for name, info in files.items()})
-        if not out and self.isfile(path):
-            # walk works on directories, but find should also return [path]
-            # when path happens to be a file
-            out[path] = {}
-        names = sorted(out)
+                out.extend((info["name"], info) for info in dirs.values())
+
+        # sort once, the later entry wins on duplicated names as dict.update does
+        out.sort(key=itemgetter(0))
         if not detail:
-            return names
+            return list(dict.fromkeys(name for name, _ in out))
         else:
-            return {name: out[name] for name in names}
+            return dict(out)
 
     def put(
         self,
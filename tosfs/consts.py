@@ -16,6 +16,7 @@
 
 # Tos server response status codes
 TOS_SERVER_STATUS_CODE_NOT_FOUND = 404
+TOS_SERVER_STATUS_CODE_PRECONDITION_FAILED = 412
 
 # tos bucket type (hns, fns)
 TOS_BUCKET_TYPE_HNS = "hns"
@@ -31,9 +32,16 @@ MPU_PART_SIZE_THRESHOLD = 4 * 2**20  # 4MB
 FILE_OPERATION_READ_WRITE_BUFFER_SIZE = 5 * 2**20  # 5MB
 PUT_OBJECT_OPERATION_SMALL_FILE_THRESHOLD = 5 * 2**30  # 5GB
 GET_OBJECT_OPERATION_DEFAULT_READ_CHUNK_SIZE = 2**16  # 64KB
+GET_OBJECT_OPERATION_PREFETCH_CHUNKS = 4
+# the times a download restarts when the object is overwritten meanwhile
+GET_OBJECT_OPERATION_MAX_RESTARTS = 3
 APPEND_OPERATION_SMALL_FILE_THRESHOLD = 5 * 2**20  # 5MB
 
 LS_OPERATION_DEFAULT_MAX_ITEMS = 1000
+DELETE_OPERATION_MAX_BATCH_SIZE = 1000
+WALK_OPERATION_DEFAULT_MAX_WORKERS = 16
+
+PATH_CACHE_MAX_SIZE = 4096
 
 TOSFS_LOG_FORMAT = "%(asctime)s %(name)s [%(levelname)s] %(filename)s:%(lineno)d %(funcName)s : %(message)s"  # noqa: E501
 
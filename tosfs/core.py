@@ -13,14 +13,37 @@
 # limitations under the License.
 
 """The core module of TOSFS."""
+import functools
+import hashlib
 import io
 import logging
 import mimetypes
 import os
+import re
 import tempfile
+import threading
+import time
 import warnings
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from glob import has_magic
-from typing import Any, BinaryIO, Collection, Generator, List, Optional, Tuple, Union
+from operator import itemgetter
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    ClassVar,
+    Collection,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import tos
 from fsspec.spec import AbstractBufferedFile
@@ -29,40 +52,70 @@ from tos.auth import CredentialProviderAuth
 from tos.exceptions import TosClientError, TosServerError
 from tos.models import CommonPrefixInfo
 from tos.models2 import (
+    DeleteObjectOutput,
+    FileStatusOutput,
+    HeadObjectOutput,
     ListedObject,
     ListedObjectVersion,
     ListObjectType2Output,
     PartInfo,
+    PutObjectOutput,
     UploadPartCopyOutput,
 )
 
 from tosfs.compatible import FsspecCompatibleFS
 from tosfs.consts import (
+    DELETE_OPERATION_MAX_BATCH_SIZE,
     ENV_NAME_TOS_BUCKET_TAG_ENABLE,
     ENV_NAME_TOS_SDK_LOGGING_LEVEL,
     ENV_NAME_TOSFS_LOGGING_LEVEL,
     FILE_OPERATION_READ_WRITE_BUFFER_SIZE,
     GET_OBJECT_OPERATION_DEFAULT_READ_CHUNK_SIZE,
+    GET_OBJECT_OPERATION_MAX_RESTARTS,
+    GET_OBJECT_OPERATION_PREFETCH_CHUNKS,
     LS_OPERATION_DEFAULT_MAX_ITEMS,
     MANAGED_COPY_MAX_THRESHOLD,
     MANAGED_COPY_MIN_THRESHOLD,
     MPU_PART_SIZE_THRESHOLD,
     PART_MAX_SIZE,
+    PATH_CACHE_MAX_SIZE,
     PUT_OBJECT_OPERATION_SMALL_FILE_THRESHOLD,
     TOS_BUCKET_TYPE_FNS,
     TOS_BUCKET_TYPE_HNS,
     TOS_SERVER_STATUS_CODE_NOT_FOUND,
+    TOS_SERVER_STATUS_CODE_PRECONDITION_FAILED,
     TOSFS_LOG_FORMAT,
+    WALK_OPERATION_DEFAULT_MAX_WORKERS,
 )
 from tosfs.exceptions import TosfsError
 from tosfs.fsspec_utils import glob_translate
 from tosfs.models import DeletingObject
 from tosfs.mpu import MultipartUploader
-from tosfs.retry import CONFLICT_CODE, INVALID_RANGE_CODE, retryable_func_executor
+from tosfs.retry import (
+    CONFLICT_CODE,
+    INVALID_RANGE_CODE,
+    MAX_CONCURRENT_RETRIES,
+    retryable,
+    retryable_func_executor,
+)
 from tosfs.tag import BucketTagMgr
-from tosfs.utils import find_bucket_key, get_brange
+from tosfs.utils import (
+    SharedThreadPool,
+    canonical_dir,
+    find_bucket_key,
+    get_brange,
+    get_part_ranges,
+    in_pool_thread,
+    pipe_chunks,
+    pwrite_all,
+)
 from tosfs.version import Version
 
+try:
+    import re2
+except ImportError:
+    re2 = None
+
 logger = logging.getLogger("tosfs")
 
 
@@ -86,10 +139,62 @@ def setup_logging() -> None:
     )
 
 
-setup_logging()
+_GLOB_MAGIC = re.compile(r"[*?\[]")
+
+
+@functools.lru_cache(maxsize=512)
+def _compile_glob(pattern: str) -> Any:
+    regex = glob_translate(pattern)
+    if re2 is not None:
+        # RE2 matches in linear time, but spells the end-of-text anchor as \z
+        try:
+            return re2.compile(
+                regex[:-2] + r"\z" if regex.endswith(r"\Z") else regex
+            )
+        except re2.error:
+            pass
+    return re.compile(regex)
+
+
+def _glob_matches(pattern: Any, allpaths: dict, append_slash_to_dirname: bool) -> dict:
+    match = pattern.match
+    if append_slash_to_dirname:
+        matched = [
+            p
+            for p, info in allpaths.items()
+            if match(p + "/" if info["type"] == "directory" else p)
+        ]
+    else:
+        matched = list(filter(match, allpaths))
+    # only the matches need ordering
+    return {p: allpaths[p] for p in sorted(matched)}
+
+
+def _put_evicting_oldest(cache: dict, key: Any, value: Any) -> None:
+    """Put the entry last in the cache, evicting the oldest one if it is full."""
+    cache.pop(key, None)
+    if len(cache) >= PATH_CACHE_MAX_SIZE:
+        del cache[next(iter(cache))]
+    cache[key] = value
+
 
-if logger.level < logging.WARNING:
-    logger.warning(
+def _is_related_key(key: str, other: str) -> bool:
+    """Tell whether one of the keys is the other or one of its parents."""
+    shorter, longer = sorted((key, other), key=len)
+    return not shorter or longer == shorter or longer.startswith(shorter + "/")
+
+
+@functools.lru_cache(maxsize=1)
+def _ensure_logging_configured() -> None:
+    """Set up the logging configuration once, on the first use of TOSFS.
+
+    Nothing is done if the application has already attached handlers to the
+    tosfs logger, its configuration takes precedence.
+    """
+    if logger.handlers:
+        return
+    setup_logging()
+    logger.debug(
         "The tosfs's log level is set to be %s", logging.getLevelName(logger.level)
     )
 
@@ -103,6 +208,13 @@ class TosFileSystem(FsspecCompatibleFS):
 
     protocol = ("tos",)
 
+    # clients shared by the live instances that have the same client
+    # configuration, keyed by a digest of it so that no secret is kept
+    _client_cache: ClassVar[weakref.WeakValueDictionary] = (
+        weakref.WeakValueDictionary()
+    )
+    _client_cache_lock: ClassVar[threading.Lock] = threading.Lock()
+
     def __init__(
         self,
         endpoint: Optional[str] = None,
@@ -120,7 +232,7 @@ class TosFileSystem(FsspecCompatibleFS):
         default_block_size: Optional[int] = None,
         default_fill_cache: bool = True,
         default_cache_type: str = "readahead",
-        multipart_staging_dirs: str = tempfile.mkdtemp(),
+        multipart_staging_dirs: Optional[str] = None,
         multipart_size: int = 8 << 20,
         multipart_thread_pool_size: int = max(2, os.cpu_count() or 1),
         multipart_threshold: int = 5 << 20,
@@ -133,6 +245,11 @@ class TosFileSystem(FsspecCompatibleFS):
         proxy_password: Optional[str] = None,
         disable_encoding_meta: Optional[bool] = None,
         except100_continue_threshold: int = 65536,
+        use_listings_cache: bool = False,
+        listings_expiry_time: Optional[float] = None,
+        max_paths: Optional[int] = None,
+        stat_cache_ttl: Optional[float] = None,
+        max_parallel_listings: int = WALK_OPERATION_DEFAULT_MAX_WORKERS,
         endpoint_url: Optional[str] = None,  # Deprecated parameter
         **kwargs: Any,
     ) -> None:
@@ -154,7 +271,10 @@ class TosFileSystem(FsspecCompatibleFS):
             The maximum number of retries for a failed request (default is 20).
         max_connections : int, optional
             The maximum number of HTTP connections that can be opened in the
-            connection pool (default is 1024).
+            connection pool (default is 1024). It sizes the keep-alive pool
+            of the underlying client, so keep it above the number of requests
+            run in parallel (e.g. multipart_thread_pool_size) to have their
+            connections reused instead of reopened.
         connection_timeout : int, optional
             The time to keep a connection open in seconds (default is 10).
         socket_timeout : int, optional
@@ -183,8 +303,8 @@ class TosFileSystem(FsspecCompatibleFS):
             The default cache type (default is 'readahead').
         multipart_staging_dirs : str, optional
             The staging directories for multipart uploads (default is a temporary
-            directory). Separate the staging dirs with comma if there are many
-            staging dir paths.
+            directory created for the instance). Separate the staging dirs with
+            comma if there are many staging dir paths.
         multipart_size : int, optional
             The multipart upload part size of the given object storage.
             (default is 8MB).
@@ -195,7 +315,8 @@ class TosFileSystem(FsspecCompatibleFS):
             The threshold which control whether enable multipart upload during
             writing data to the given object storage, if the write data size is less
             than threshold, will write data via simple put instead of multipart upload.
-            default is 10 MB.
+            Objects smaller than the threshold are also downloaded by get_file with
+            a single request instead of concurrent ranged ones. default is 5 MB.
         enable_crc : bool
             Whether to enable client side CRC check after upload, default is true
         enable_verify_ssl : bool
@@ -221,12 +342,37 @@ class TosFileSystem(FsspecCompatibleFS):
             length of the data to be uploaded greater than the threshold
             (if the length of the data cannot be predicted, it is uniformly determined
             to be greater than the threshold), unit byte, default 65536
+        use_listings_cache : bool, optional
+            Whether to cache the directory listings of ``ls``, so that traversals
+            like ``walk`` and ``find`` do not list the same directory twice
+            (default is False). A recursive ``find`` fills the cache for every
+            directory under its path. ``info``, ``exists``, ``isdir`` and
+            ``isfile`` answer from the cached listings too. The cache is
+            invalidated by the mutating operations of this filesystem instance
+            only.
+        listings_expiry_time : float, optional
+            The time in seconds that a cached listing is considered valid
+            (default is None, means never expire).
+        max_paths : int, optional
+            The maximum number of cached listings (default is None, means no limit).
+        stat_cache_ttl : float, optional
+            The time in seconds that the result of a metadata request (as issued by
+            ``exists``, ``isfile``, ``isdir`` and ``info``) is reused for the same
+            path (default is None, means no reuse). The entries of a path are
+            dropped by the mutating operations of this filesystem instance, the
+            changes made by other clients are seen after the ttl only.
+        max_parallel_listings : int, optional
+            The maximum number of prefixes listed concurrently by a recursive
+            listing, such as the one of ``find`` (default is 16). Set it to 1 to
+            list sequentially.
         endpoint_url : str, optional
             (deprecated) The endpoint URL of the TOS service.
         kwargs : Any, optional
             Additional arguments.
 
         """
+        _ensure_logging_configured()
+
         if endpoint_url is not None:
             warnings.warn(
                 "The 'endpoint_url' parameter is deprecated and will be removed"
@@ -236,32 +382,28 @@ class TosFileSystem(FsspecCompatibleFS):
             )
             endpoint = endpoint_url
 
-        self.tos_client = tos.TosClientV2(
-            key,
-            secret,
-            endpoint,
-            region,
-            security_token=session_token,
-            max_retry_count=0,
-            max_connections=max_connections,
-            connection_time=connection_timeout,
-            socket_timeout=socket_timeout,
-            high_latency_log_threshold=high_latency_log_threshold,
-            credentials_provider=credentials_provider,
-            enable_crc=enable_crc,
-            enable_verify_ssl=enable_verify_ssl,
-            disable_encoding_meta=disable_encoding_meta,
-            dns_cache_time=dns_cache_timeout,
-            proxy_host=proxy_host,
-            proxy_port=proxy_port,
-            proxy_username=proxy_username,
-            proxy_password=proxy_password,
-            except100_continue_threshold=except100_continue_threshold,
-            user_agent_product_name="EMR",
-            user_agent_soft_name="TOSFS",
-            user_agent_soft_version=Version.version,
-            user_agent_customized_key_values={"revision": Version.revision},
-        )
+        client_config = {
+            "ak": key,
+            "sk": secret,
+            "endpoint": endpoint,
+            "region": region,
+            "security_token": session_token,
+            "max_connections": max_connections,
+            "connection_time": connection_timeout,
+            "socket_timeout": socket_timeout,
+            "high_latency_log_threshold": high_latency_log_threshold,
+            "credentials_provider": credentials_provider,
+            "enable_crc": enable_crc,
+            "enable_verify_ssl": enable_verify_ssl,
+            "disable_encoding_meta": disable_encoding_meta,
+            "dns_cache_time": dns_cache_timeout,
+            "proxy_host": proxy_host,
+            "proxy_port": proxy_port,
+            "proxy_username": proxy_username,
+            "proxy_password": proxy_password,
+            "except100_continue_threshold": except100_continue_threshold,
+        }
+        self.tos_client = self._get_client(client_config)
         if version_aware:
             raise ValueError("Currently, version_aware is not supported.")
 
@@ -279,15 +421,42 @@ class TosFileSystem(FsspecCompatibleFS):
         self.default_fill_cache = default_fill_cache
         self.default_cache_type = default_cache_type
         self.max_retry_num = max_retry_num
+        # bounds the retries of this filesystem backing off at once
+        self._retry_budget = threading.BoundedSemaphore(MAX_CONCURRENT_RETRIES)
 
+        if multipart_staging_dirs is None:
+            multipart_staging_dirs = tempfile.mkdtemp()
         self.multipart_staging_dirs = [
             d.strip() for d in multipart_staging_dirs.split(",")
         ]
+        self._staging_dirs_ready = False
         self.multipart_size = multipart_size
         self.multipart_thread_pool_size = multipart_thread_pool_size
         self.multipart_threshold = multipart_threshold
 
-        super().__init__(**kwargs)
+        self.max_parallel_listings = max(1, max_parallel_listings)
+        self._executor = SharedThreadPool(multipart_thread_pool_size, "tosfs")
+        self._listing_executor = SharedThreadPool(
+            max(self.max_parallel_listings, WALK_OPERATION_DEFAULT_MAX_WORKERS),
+            "tosfs-listing",
+        )
+        # shut the pools down once the filesystem is collected or at exit
+        for pool in (self._executor, self._listing_executor):
+            weakref.finalize(self, pool.shutdown)
+        self.stat_cache_ttl = stat_cache_ttl
+        self._stat_cache: Dict[Tuple, Tuple[float, Any]] = {}
+        # guards the stat cache and the created directories below
+        self._stat_cache_lock = threading.Lock()
+        # directories whose marker objects were put by this instance, with the
+        # time they were put, trusted as long as the stat cache entries
+        self._created_dirs: Dict[str, float] = {}
+
+        super().__init__(
+            use_listings_cache=use_listings_cache,
+            listings_expiry_time=listings_expiry_time,
+            max_paths=max_paths,
+            **kwargs,
+        )
 
     def _open(
         self,
@@ -359,6 +528,8 @@ class TosFileSystem(FsspecCompatibleFS):
         path: str,
         detail: bool = False,
         versions: bool = False,
+        prefix: str = "",
+        refresh: bool = False,
         **kwargs: Union[str, bool, float, None],
     ) -> Union[List[dict], List[str]]:
         """List objects under the given path.
@@ -371,6 +542,12 @@ class TosFileSystem(FsspecCompatibleFS):
             Whether to return detailed information (default is False).
         versions : bool, optional
             Whether to list object versions (default is False).
+        prefix : str, optional
+            Only list the objects whose names start with ``{path}/{prefix}``
+            (default is "").
+        refresh : bool, optional
+            Whether to ignore the cached listing of the path, if the listings
+            cache is enabled (default is False).
         **kwargs : dict, optional
             Additional arguments.
 
@@ -381,11 +558,6 @@ class TosFileSystem(FsspecCompatibleFS):
             returns a list of dictionaries with detailed information.
             Otherwise, returns a list of object names.
 
-        Raises
-        ------
-        IOError
-            If there is an error accessing the parent directory.
-
         Examples
         --------
         >>> fs = TosFileSystem()
@@ -399,21 +571,26 @@ class TosFileSystem(FsspecCompatibleFS):
         path = self._strip_protocol(path)
         if path in ["", "/"]:
             files = self._ls_buckets()
-            return files if detail else sorted([o["name"] for o in files])
+            return files if detail else sorted(map(itemgetter("name"), files))
 
-        files = self._ls_dirs_and_files(path, versions=versions)
-        if not files and "/" in path:
+        if not prefix and not refresh:
             try:
-                files = self._ls_dirs_and_files(self._parent(path), versions=versions)
-            except IOError:
+                files = self.dircache[path]
+                return files if detail else sorted(map(itemgetter("name"), files))
+            except KeyError:
                 pass
-            files = [
-                o
-                for o in files
-                if o["name"].rstrip("/") == path and o["type"] != "directory"
-            ]
 
-        return files if detail else sorted([o["name"] for o in files])
+        files = self._ls_dirs_and_files(path, prefix=prefix, versions=versions)
+        if files and not prefix:
+            self.dircache[path] = files
+        if not files and "/" in path and not prefix:
+            bucket, key, version_id = self._split_path(path)
+            info = self._object_info(bucket, key, version_id)
+            # on HNS buckets a directory can be headed by its bare key as well
+            if info and (self._is_fns_bucket(bucket) or not self.isdir(path)):
+                files = [info]
+
+        return files if detail else sorted(map(itemgetter("name"), files))
 
     def ls_iterate(
         self,
@@ -464,45 +641,77 @@ class TosFileSystem(FsspecCompatibleFS):
         if recursive and self._is_hns_bucket(bucket):
             raise ValueError("Recursive listing is not supported for HNS bucket.")
 
-        prefix = key.lstrip("/") + "/" if key else ""
-        continuation_token = ""
-        is_truncated = True
-
-        while is_truncated:
-
-            def _call_list_objects_type2(
-                continuation_token: str = continuation_token,
-            ) -> ListObjectType2Output:
-                return self.tos_client.list_objects_type2(
-                    bucket,
-                    prefix,
-                    start_after=prefix,
-                    delimiter=None if recursive else "/",
-                    max_keys=batch_size,
-                    continuation_token=continuation_token,
-                )
+        prefix = f"{key.lstrip('/')}/" if key else ""
+
+        def _call_list_objects_type2(
+            continuation_token: str,
+        ) -> ListObjectType2Output:
+            return self.tos_client.list_objects_type2(
+                bucket,
+                prefix,
+                start_after=prefix,
+                delimiter=None if recursive else "/",
+                max_keys=batch_size,
+                continuation_token=continuation_token,
+            )
 
-            resp = retryable_func_executor(
+        def _fetch_page(continuation_token: str) -> ListObjectType2Output:
+            return retryable_func_executor(
                 _call_list_objects_type2,
                 args=(continuation_token,),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
-            is_truncated = resp.is_truncated
-            continuation_token = resp.next_continuation_token
+
+        def _listed_info(obj: Union[ListedObject, CommonPrefixInfo]) -> dict:
+            if isinstance(obj, CommonPrefixInfo):
+                return self._fill_dir_info(bucket, obj)
+            if obj.key.endswith("/"):
+                return self._fill_dir_info(bucket, None, obj.key)
+            return self._fill_file_info(obj, bucket, versions)
+
+        # names are built straight from the keys, without the detail dicts
+        def _listed_name(obj: Union[ListedObject, CommonPrefixInfo]) -> str:
+            key = obj.prefix if isinstance(obj, CommonPrefixInfo) else obj.key
+            return f"{bucket}/{key}".rstrip("/")
+
+        convert = _listed_info if detail else _listed_name
+
+        for resp in self._iter_pages_ahead(_fetch_page):
             results = resp.contents + resp.common_prefixes
 
-            batch = []
-            for obj in results:
-                if isinstance(obj, CommonPrefixInfo):
-                    info = self._fill_dir_info(bucket, obj)
-                elif obj.key.endswith("/"):
-                    info = self._fill_dir_info(bucket, None, obj.key)
-                else:
-                    info = self._fill_file_info(obj, bucket, versions)
+            yield [convert(obj) for obj in results]
+
+    def invalidate_cache(self, path: Optional[str] = None) -> None:
+        """Discard the cached listings of the path, its parents and descendants.
+
+        The cached metadata of these paths and the directories known to be
+        created under the path are forgotten as well.
 
-                batch.append(info if detail else info["name"])
+        Parameters
+        ----------
+        path : str, optional
+            The path whose listings are discarded, if None, clear all the
+            cached listings.
 
-            yield batch
+        """
+        if path is None:
+            with self._stat_cache_lock:
+                self._stat_cache.clear()
+                self._created_dirs.clear()
+            self.dircache.clear()
+        else:
+            path = self._strip_protocol(path).rstrip("/")
+            self._invalidate_stats(path)
+            # the listings under the path are cached as well after a find
+            subtree = path + "/"
+            for cached in [d for d in self.dircache if d.startswith(subtree)]:
+                self.dircache.pop(cached, None)
+            parent = path
+            while parent:
+                self.dircache.pop(parent, None)
+                parent = self._parent(parent)
+        super().invalidate_cache(path)
 
     def info(
         self,
@@ -543,6 +752,10 @@ class TosFileSystem(FsspecCompatibleFS):
         if not key:
             return self._bucket_info(bucket)
 
+        cached = self._cached_info(path)
+        if cached is not None:
+            return cached
+
         bucket_type = self._get_bucket_type(bucket)
         if bucket_type == TOS_BUCKET_TYPE_FNS:
             result = self._object_info(bucket, key, version_id)
@@ -605,10 +818,13 @@ class TosFileSystem(FsspecCompatibleFS):
             return self._exists_bucket(bucket)
 
         try:
-            resp = retryable_func_executor(
-                lambda: self.tos_client.get_file_status(bucket, key),
-                max_retry_num=self.max_retry_num,
-            )
+            if self._cached_info(path) is not None:
+                return True
+        except FileNotFoundError:
+            return False
+
+        try:
+            resp = self._get_file_status(bucket, key)
             return resp.key is not None
         except TosServerError as e:
             if e.status_code == TOS_SERVER_STATUS_CODE_NOT_FOUND:
@@ -651,19 +867,19 @@ class TosFileSystem(FsspecCompatibleFS):
         if not key:
             raise TosfsError("Cannot remove a bucket using rmdir api.")
 
-        if not self.exists(path):
-            raise FileNotFoundError(f"Directory {path} not found.")
-
+        # a directory answers isdir alone, existence only tells the error apart
         if not self.isdir(path):
+            if not self.exists(path):
+                raise FileNotFoundError(f"Directory {path} not found.")
             raise NotADirectoryError(f"{path} is not a directory.")
 
-        if len(self._ls_objects(bucket, max_items=1, prefix=key.rstrip("/") + "/")) > 0:
+        # the first listed child is enough, the listing stops there
+        children = self._ls_objects(bucket, max_items=1, prefix=canonical_dir(key))
+        if next(children, None) is not None:
             raise TosfsError(f"Directory {path} is not empty.")
 
-        retryable_func_executor(
-            lambda: self.tos_client.delete_object(bucket, key.rstrip("/") + "/"),
-            max_retry_num=self.max_retry_num,
-        )
+        self._delete_object(bucket, canonical_dir(key))
+        self.invalidate_cache(path)
 
     def rm(
         self, path: str, recursive: bool = False, maxdepth: Optional[int] = None
@@ -687,25 +903,28 @@ class TosFileSystem(FsspecCompatibleFS):
             "Call rm api: path %s, recursive %s, maxdepth %s", path, recursive, maxdepth
         )
         if isinstance(path, str):
-            if not self.exists(path):
-                raise FileNotFoundError(path)
-
             bucket, key, _ = self._split_path(path)
             if not key:
                 raise TosfsError(f"Cannot remove a bucket {bucket} using rm api.")
 
             if not recursive or maxdepth:
-                return super().rm(path, recursive=recursive, maxdepth=maxdepth)
+                return self._bulk_rm(self._rm_targets([path], recursive, maxdepth))
 
             if self.isfile(path):
                 self.rm_file(path)
             else:
                 try:
-                    self._list_and_batch_delete_objs(bucket, key)
-                except (TosClientError, TosServerError) as e:
+                    found = self._list_and_batch_delete_objs(bucket, key)
+                    if not found and not self.exists(path):
+                        raise FileNotFoundError(path)
+                except (FileNotFoundError, TosClientError, TosServerError) as e:
                     raise e
                 except Exception as e:
                     raise TosfsError(f"Tosfs failed with unknown error: {e}") from e
+                finally:
+                    self.invalidate_cache(path)
+        elif not recursive:
+            self._bulk_rm(self._rm_targets(path, recursive, maxdepth))
         else:
             for single_path in path:
                 self.rm(single_path, recursive=recursive, maxdepth=maxdepth)
@@ -731,25 +950,20 @@ class TosFileSystem(FsspecCompatibleFS):
         if not key:
             raise TosfsError(f"Cannot create a bucket {bucket} using mkdir api.")
 
-        if create_parents:
-            parent = self._parent(f"{bucket}/{key}".rstrip("/") + "/")
-            if not self.exists(parent):
-                # here we need to create the parent directory recursively
-                self.mkdir(parent, create_parents=True)
+        dir_path = f"{bucket}/{key.rstrip('/')}"
+        if self._recently_created(dir_path):
+            return
 
-            retryable_func_executor(
-                lambda: self.tos_client.put_object(bucket, key.rstrip("/") + "/"),
-                max_retry_num=self.max_retry_num,
-            )
+        if create_parents:
+            self._mkdir_with_parents(bucket, key)
         else:
             parent = self._parent(path)
             if not self.exists(parent):
                 raise FileNotFoundError(f"Parent directory {parent} does not exist.")
             else:
-                retryable_func_executor(
-                    lambda: self.tos_client.put_object(bucket, key.rstrip("/") + "/"),
-                    max_retry_num=self.max_retry_num,
-                )
+                self._put_object(bucket, canonical_dir(key))
+        self.invalidate_cache(path)
+        self._remember_created([dir_path])
 
     def makedirs(self, path: str, exist_ok: bool = False) -> None:
         """Recursively make directories.
@@ -810,10 +1024,8 @@ class TosFileSystem(FsspecCompatibleFS):
         if not truncate and self.exists(path):
             raise FileExistsError(f"File {path} already exists.")
 
-        retryable_func_executor(
-            lambda: self.tos_client.put_object(bucket, key),
-            max_retry_num=self.max_retry_num,
-        )
+        self._put_object(bucket, key)
+        self.invalidate_cache(path)
 
     def isdir(self, path: str) -> bool:
         """Check if the path is a directory.
@@ -848,18 +1060,19 @@ class TosFileSystem(FsspecCompatibleFS):
         if not key:
             return False
 
+        try:
+            cached = self._cached_info(path.rstrip("/"))
+        except FileNotFoundError:
+            return False
+        if cached is not None:
+            return cached["type"] == "directory"
+
         try:
             if self._is_fns_bucket(bucket):
-                resp = retryable_func_executor(
-                    lambda: self.tos_client.get_file_status(bucket, key),
-                    max_retry_num=self.max_retry_num,
-                )
+                resp = self._get_file_status(bucket, key)
                 return resp.key != key
             else:
-                resp = retryable_func_executor(
-                    lambda: self.tos_client.head_object(bucket, key),
-                    max_retry_num=self.max_retry_num,
-                )
+                resp = self._head_object(bucket, key)
                 return resp.is_directory
         except TosServerError as e:
             if e.status_code == TOS_SERVER_STATUS_CODE_NOT_FOUND:
@@ -888,14 +1101,15 @@ class TosFileSystem(FsspecCompatibleFS):
             return False
 
         try:
-            resp = retryable_func_executor(
-                lambda: self.tos_client.head_object(bucket, key),
-                max_retry_num=self.max_retry_num,
-            )
-            if self._is_fns_bucket(bucket):
-                return True
-            else:
-                return not resp.is_directory
+            cached = self._cached_info(self._strip_protocol(path))
+        except FileNotFoundError:
+            return False
+        if cached is not None:
+            return cached["type"] == "file"
+
+        try:
+            resp = self._head_object(bucket, key)
+            return self._is_fns_bucket(bucket) or not resp.is_directory
         except TosClientError as e:
             raise e
         except TosServerError as e:
@@ -977,46 +1191,34 @@ class TosFileSystem(FsspecCompatibleFS):
         if "ContentType" not in kwargs:
             content_type, _ = mimetypes.guess_type(lpath)
 
-        if self.isfile(rpath):
-            self.makedirs(self._parent(rpath), exist_ok=True)
+        try:
+            rtype = self.info(rpath)["type"]
+        except FileNotFoundError:
+            rtype = None
 
-        if self.isdir(rpath):
-            rpath = os.path.join(rpath, os.path.basename(lpath))
+        if rtype == "file":
+            self.makedirs(self._parent(rpath), exist_ok=True)
+        elif rtype == "directory":
+            rpath = rpath.rstrip("/") + "/" + os.path.basename(lpath)
             self.mkdirs(self._parent(rpath), exist_ok=True)
 
         bucket, key, _ = self._split_path(rpath)
 
-        with open(lpath, "rb") as f:
-            if size < min(PUT_OBJECT_OPERATION_SMALL_FILE_THRESHOLD, 2 * chunksize):
-                chunk = f.read()
-                retryable_func_executor(
-                    lambda: self.tos_client.put_object(
-                        bucket,
-                        key,
-                        content=chunk,
-                        content_type=content_type,
-                    ),
-                    max_retry_num=self.max_retry_num,
-                )
-            else:
-                mpu = retryable_func_executor(
-                    lambda: self.tos_client.create_multipart_upload(
-                        bucket, key, content_type=content_type
-                    ),
-                    max_retry_num=self.max_retry_num,
-                )
-                retryable_func_executor(
-                    lambda: self.tos_client.upload_part_from_file(
-                        bucket, key, mpu.upload_id, file_path=lpath, part_number=1
-                    ),
-                    max_retry_num=self.max_retry_num,
-                )
-                retryable_func_executor(
-                    lambda: self.tos_client.complete_multipart_upload(
-                        bucket, key, mpu.upload_id, complete_all=True
-                    ),
-                    max_retry_num=self.max_retry_num,
-                )
+        if size < min(PUT_OBJECT_OPERATION_SMALL_FILE_THRESHOLD, 2 * chunksize):
+            retryable_func_executor(
+                lambda: self.tos_client.put_object_from_file(
+                    bucket,
+                    key,
+                    file_path=lpath,
+                    content_length=size,
+                    content_type=content_type,
+                ),
+                max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
+            )
+        else:
+            self._put_file_multipart(bucket, key, lpath, size, content_type)
+        self.invalidate_cache(rpath)
 
     def get_file(self, rpath: str, lpath: str, **kwargs: Any) -> None:
         """Get a file from the TOS filesystem and write to a local path.
@@ -1047,28 +1249,45 @@ class TosFileSystem(FsspecCompatibleFS):
         if os.path.isdir(lpath):
             return
 
-        if not self.exists(rpath):
-            raise FileNotFoundError(rpath)
-
         bucket, key, version_id = self._split_path(rpath)
+        kwargs.pop("callback", None)
 
-        def _read_chunks(body: BinaryIO, f: BinaryIO) -> None:
-            bytes_read = 0
-            while True:
-                chunk = body.read(GET_OBJECT_OPERATION_DEFAULT_READ_CHUNK_SIZE)
-                if not chunk:
-                    break
-                bytes_read += len(chunk)
-                f.write(chunk)
+        for _ in range(max(1, GET_OBJECT_OPERATION_MAX_RESTARTS)):
+            try:
+                size, downloaded, etag = retryable_func_executor(
+                    self._get_file_first_part,
+                    args=(bucket, key, version_id, lpath),
+                    kwargs=kwargs,
+                    max_retry_num=self.max_retry_num,
+                    retry_budget=self._retry_budget,
+                )
+            except TosServerError as e:
+                if e.status_code == TOS_SERVER_STATUS_CODE_NOT_FOUND:
+                    raise FileNotFoundError(rpath) from e
+                raise e
 
-        def download_file() -> None:
-            body, content_length = self._open_remote_file(
-                bucket, key, version_id, range_start=0, **kwargs
-            )
-            with open(lpath, "wb") as f:
-                retryable_func_executor(_read_chunks, args=(body, f))
+            if size <= downloaded:
+                return
+            try:
+                self._get_file_multipart(
+                    bucket,
+                    key,
+                    version_id,
+                    lpath,
+                    size,
+                    start=downloaded,
+                    etag=etag,
+                    **kwargs,
+                )
+                return
+            except TosServerError as e:
+                if e.status_code != TOS_SERVER_STATUS_CODE_PRECONDITION_FAILED:
+                    raise e
+                # the ranges are pinned to the etag of the first part, the
+                # object was overwritten in the meantime
+                logger.warning("%s changed while downloading, restart it", rpath)
 
-        retryable_func_executor(download_file)
+        raise TosfsError(f"{rpath} kept changing while being downloaded.")
 
     def walk(
         self,
@@ -1113,6 +1332,9 @@ class TosFileSystem(FsspecCompatibleFS):
         withdirs: bool = False,
         detail: bool = False,
         prefix: str = "",
+        *,
+        shards: Optional[Sequence[str]] = None,
+        sort: bool = True,
         **kwargs: Any,
     ) -> Union[List[str], dict]:
         """Find all files or dirs with conditions.
@@ -1133,6 +1355,13 @@ class TosFileSystem(FsspecCompatibleFS):
             exact match ``filename == {path}/{prefix}``, it also will be included)
         detail: bool
             If True, return a dict with file information, else just the path
+        shards: list of str, optional
+            If given, the objects are listed with one concurrent request per
+            name prefix shard, the shards must cover all the names under
+            ``{path}/{prefix}``.
+        sort: bool
+            Whether to return the entries ordered by name (default is True),
+            callers that reorder or merge the result may skip it.
         **kwargs: Any
             Additional arguments.
 
@@ -1158,10 +1387,13 @@ class TosFileSystem(FsspecCompatibleFS):
                 maxdepth=maxdepth,
                 withdirs=withdirs,
                 detail=detail,
+                shards=shards,
                 **kwargs,
             )
 
-        out = self._find_file_dir(key, path, prefix, withdirs, kwargs)
+        out = self._find_file_dir(key, path, prefix, withdirs, kwargs, shards=shards)
+        if sort:
+            out.sort(key=itemgetter("name"))
 
         if detail:
             return {o["name"]: o for o in out}
@@ -1197,35 +1429,12 @@ class TosFileSystem(FsspecCompatibleFS):
             raise ValueError("maxdepth must be at least 1")
 
         if isinstance(path, str):
-            return self.expand_path([path], recursive, maxdepth)
-
-        out = set()
-        path = [self._strip_protocol(p) for p in path]
-        for p in path:  # can gather here
-            if has_magic(p):
-                bit = set(self.glob(p, maxdepth=maxdepth))
-                out |= bit
-                if recursive:
-                    # glob call above expanded one depth so if maxdepth is defined
-                    # then decrement it in expand_path call below. If it is zero
-                    # after decrementing then avoid expand_path call.
-                    if maxdepth is not None and maxdepth <= 1:
-                        continue
-                    out |= set(
-                        self.expand_path(
-                            list(bit),
-                            recursive=recursive,
-                            maxdepth=maxdepth - 1 if maxdepth is not None else None,
-                        )
-                    )
-                continue
-            elif recursive:
-                rec = set(self.find(p, maxdepth=maxdepth, withdirs=True))
-                out |= rec
-            if p not in out and (recursive is False or self.exists(p)):
-                # should only check once, for the root
-                out.add(p)
+            path = [path]
 
+        out: Set[str] = set()
+        self._expand_path_into(
+            out, set(), [self._strip_protocol(p) for p in path], recursive, maxdepth
+        )
         if not out:
             raise FileNotFoundError(path)
         return sorted(out)
@@ -1280,9 +1489,6 @@ class TosFileSystem(FsspecCompatibleFS):
             logger.warning("Source and destination are the same: %s", path1)
             return
 
-        if self.isdir(path1) and self.isdir(path2):
-            return
-
         bucket, key, vers = self._split_path(path1)
 
         info = self.info(path1, bucket, key, version_id=vers)
@@ -1290,7 +1496,8 @@ class TosFileSystem(FsspecCompatibleFS):
             raise FileNotFoundError(f"Can not get information for path: {path1}")
 
         if info["type"] == "directory":
-            logger.warning("Do not support copy directory %s.", path1)
+            if not self.isdir(path2):
+                logger.warning("Do not support copy directory %s.", path1)
             return
 
         size = info["size"]
@@ -1314,6 +1521,7 @@ class TosFileSystem(FsspecCompatibleFS):
 
             # serial multipart copy
             self._copy_managed(path1, path2, size, **kwargs)
+        self.invalidate_cache(path2)
 
     def glob(
         self, path: str, maxdepth: Optional[int] = None, **kwargs: Any
@@ -1336,8 +1544,6 @@ class TosFileSystem(FsspecCompatibleFS):
         if maxdepth is not None and maxdepth < 1:
             raise ValueError("maxdepth must be at least 1")
 
-        import re
-
         seps = (os.path.sep, os.path.altsep) if os.path.altsep else (os.path.sep,)
         ends_with_sep = path.endswith(seps)  # _strip_protocol strips trailing slash
         path = self._strip_protocol(path)
@@ -1345,14 +1551,12 @@ class TosFileSystem(FsspecCompatibleFS):
             tuple(sep + "**" for sep in seps)
         )
 
-        idx_star = path.find("*") if path.find("*") >= 0 else len(path)
-        idx_qmark = path.find("?") if path.find("?") >= 0 else len(path)
-        idx_brace = path.find("[") if path.find("[") >= 0 else len(path)
-        min_idx = min(idx_star, idx_qmark, idx_brace)
+        magic = _GLOB_MAGIC.search(path)
+        min_idx = magic.start() if magic else len(path)
 
         detail = kwargs.pop("detail", False)
 
-        if not has_magic(path):
+        if magic is None:
             if self.exists(path, **kwargs):
                 return {path: self.info(path, **kwargs)} if detail else [path]
             return {} if detail else []
@@ -1371,21 +1575,25 @@ class TosFileSystem(FsspecCompatibleFS):
             else:
                 depth = None
 
-        allpaths = self.find(root, maxdepth=depth, withdirs=True, detail=True, **kwargs)
-        pattern = re.compile(glob_translate(path + ("/" if ends_with_sep else "")))
-
-        if isinstance(allpaths, dict):
-            out = {
-                p: info
-                for p, info in sorted(allpaths.items())
-                if pattern.match(
-                    p + "/"
-                    if append_slash_to_dirname and info["type"] == "directory"
-                    else p
-                )
-            }
+        if depth == 1 and root and "**" not in path:
+            # the magic is confined to the last level, a single listing will do
+            try:
+                allpaths = {
+                    o["name"]: o for o in self.ls(root, detail=True, **kwargs)
+                }
+            except FileNotFoundError:
+                allpaths = {}
         else:
-            out = {}
+            allpaths = self.find(
+                root, maxdepth=depth, withdirs=True, detail=True, sort=False, **kwargs
+            )
+        pattern = _compile_glob(path + ("/" if ends_with_sep else ""))
+
+        out = (
+            _glob_matches(pattern, allpaths, append_slash_to_dirname)
+            if isinstance(allpaths, dict)
+            else {}
+        )
 
         return out if detail else list(out)
 
@@ -1394,63 +1602,146 @@ class TosFileSystem(FsspecCompatibleFS):
         bucket, key, _ = self._split_path(path)
 
         if path.endswith("/") or self.isdir(path):
-            key = key.rstrip("/") + "/"
+            key = canonical_dir(key)
 
         try:
             retryable_func_executor(
                 lambda: self.tos_client.delete_object(bucket, key),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
         except (TosClientError, TosServerError) as e:
             raise e
         except Exception as e:
             raise TosfsError(f"Tosfs failed with unknown error: {e}") from e
+        finally:
+            self.invalidate_cache(path)
 
     ########################  private methods  ########################
 
-    def _list_and_batch_delete_objs(self, bucket: str, key: str) -> None:
-        bucket_type = self._get_bucket_type(bucket)
-        is_truncated = True
-        continuation_token = ""
-        all_results = []
+    def _rm_targets(
+        self, paths: List[str], recursive: bool, maxdepth: Optional[int]
+    ) -> Dict[str, dict]:
+        """Return the infos of the paths that rm deletes, keyed by name.
 
-        if bucket_type == TOS_BUCKET_TYPE_FNS:
+        A literal path is resolved by one info call, which also tells whether
+        it exists, a path that matches nothing raises FileNotFoundError.
+        """
+        targets: Dict[str, dict] = {}
+        for path in [self._strip_protocol(p) for p in paths]:
+            bucket, key, _ = self._split_path(path)
+            if not key:
+                raise TosfsError(f"Cannot remove a bucket {bucket} using rm api.")
+            if has_magic(path):
+                found = self.glob(path, maxdepth=maxdepth, detail=True)
+                if recursive and (maxdepth is None or maxdepth > 1):
+                    # the glob above expanded one level
+                    for name, info in list(found.items()):
+                        if info["type"] == "directory":
+                            found.update(
+                                self.find(
+                                    name,
+                                    maxdepth=maxdepth - 1 if maxdepth else None,
+                                    withdirs=True,
+                                    detail=True,
+                                )
+                            )
+            elif recursive:
+                found = self.find(path, maxdepth=maxdepth, withdirs=True, detail=True)
+            else:
+                found = {path: self.info(path)}
+            if not found:
+                raise FileNotFoundError(path)
+            targets.update(found)
+        return targets
 
-            def _call_list_objects(
-                continuation_token: str = "",
-            ) -> ListObjectType2Output:
-                return retryable_func_executor(
-                    lambda: self.tos_client.list_objects_type2(
-                        bucket,
-                        prefix=key.rstrip("/") + "/",
-                        max_keys=LS_OPERATION_DEFAULT_MAX_ITEMS,
-                        continuation_token=continuation_token,
-                    ),
-                    max_retry_num=self.max_retry_num,
-                )
+    def _bulk_rm(self, targets: Dict[str, dict]) -> None:
+        """Delete the targets, in concurrent multi-object deletes on FNS buckets.
 
-            while is_truncated:
-                resp = _call_list_objects(continuation_token)
-                is_truncated = resp.is_truncated
-                continuation_token = resp.next_continuation_token
-                all_results = resp.contents
+        The targets map the paths to their infos, which tell the directories
+        apart from the files.
+        """
+        keys_by_bucket: Dict[str, List[str]] = {}
+        for path, info in targets.items():
+            bucket, key, _ = self._split_path(path)
+            if info["type"] == "directory":
+                key = canonical_dir(key)
+            keys_by_bucket.setdefault(bucket, []).append(key)
 
-                deleting_objects = [
-                    DeletingObject(o.key if hasattr(o, "key") else o.prefix)
-                    for o in all_results
+        try:
+            for bucket, keys in keys_by_bucket.items():
+                if not self._is_fns_bucket(bucket):
+                    # the children go before their directories
+                    for key in sorted(keys, reverse=True):
+                        self._delete_object(bucket, key)
+                    continue
+
+                deleting_objects = [DeletingObject(key) for key in keys]
+
+                batch_size = DELETE_OPERATION_MAX_BATCH_SIZE
+                batches = [
+                    deleting_objects[i : i + batch_size]
+                    for i in range(0, len(deleting_objects), batch_size)
                 ]
+                self._run_in_pool(
+                    functools.partial(self._delete_objects, bucket),
+                    [(batch,) for batch in batches],
+                )
+        except (TosClientError, TosServerError) as e:
+            raise e
+        except Exception as e:
+            raise TosfsError(f"Tosfs failed with unknown error: {e}") from e
+        finally:
+            for path in targets:
+                self.invalidate_cache(path)
+
+    def _list_and_batch_delete_objs(self, bucket: str, key: str) -> bool:
+        bucket_type = self._get_bucket_type(bucket)
+        found = False
 
-                if deleting_objects:
-                    self._delete_objects(bucket, deleting_objects)
+        if bucket_type == TOS_BUCKET_TYPE_FNS:
+            # keep listing while the batches of the previous pages are deleted,
+            # with a bounded number of batches in flight
+            max_pending = 2 * self.multipart_thread_pool_size
+            pending: Set[Future] = set()
+            try:
+                for resp in self._iter_listing(bucket, canonical_dir(key)):
+                    deleting_objects = [
+                        DeletingObject(o.key if hasattr(o, "key") else o.prefix)
+                        for o in resp.contents
+                    ]
+
+                    if deleting_objects:
+                        found = True
+                        pending.add(
+                            self._executor.submit(
+                                self._delete_objects, bucket, deleting_objects
+                            )
+                        )
+
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+
+                for future in pending:
+                    future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+                wait(pending)
         elif bucket_type == TOS_BUCKET_TYPE_HNS:
             all_results = self._list_and_collect_objects(
-                bucket, bucket_type, key.rstrip("/") + "/"
+                bucket, bucket_type, canonical_dir(key)
             )
             if all_results:
+                found = True
                 self._delete_objects(bucket, all_results)
         else:
             raise ValueError(f"Unsupported bucket type: {bucket_type}")
 
+        return found
+
     def _delete_objects(
         self, bucket: str, deleting_objects: list[DeletingObject]
     ) -> None:
@@ -1461,21 +1752,201 @@ class TosFileSystem(FsspecCompatibleFS):
                     bucket, deleting_objects, quiet=True
                 ),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
             if delete_resp.error:
                 for d in delete_resp.error:
                     logger.warning("Deleted object: %s failed", d)
         else:
+            # Delete level by level from the deepest one, so that directories are
+            # empty when they are removed, the entries of a level in parallel
+            levels: Dict[int, List[DeletingObject]] = {}
+            for obj in deleting_objects:
+                levels.setdefault(obj.key.rstrip("/").count("/"), []).append(obj)
+
+            for depth in sorted(levels, reverse=True):
+                self._run_in_pool(
+                    self._delete_object, [(bucket, obj.key) for obj in levels[depth]]
+                )
 
-            def _call_delete_object(obj: DeletingObject) -> None:
-                retryable_func_executor(
-                    lambda: self.tos_client.delete_object(bucket, obj.key),
-                    max_retry_num=self.max_retry_num,
+    def _expand_path_into(
+        self,
+        out: Set[str],
+        found_roots: Set[str],
+        paths: Collection[str],
+        recursive: bool,
+        maxdepth: Optional[int],
+    ) -> None:
+        """Add the expansion of paths to out.
+
+        ``found_roots`` holds the paths whose whole tree is already in out, the
+        paths under them are skipped instead of being listed again.
+        """
+        for p in paths:
+            if has_magic(p):
+                bit = set(self.glob(p, maxdepth=maxdepth))
+                out.update(bit)
+                # glob call above expanded one depth so if maxdepth is defined
+                # then decrement it in the call below. If it is zero after
+                # decrementing then avoid the call.
+                if recursive and (maxdepth is None or maxdepth > 1):
+                    self._expand_path_into(
+                        out,
+                        found_roots,
+                        sorted(bit),
+                        recursive,
+                        maxdepth - 1 if maxdepth is not None else None,
+                    )
+                continue
+
+            if recursive:
+                # "dir" and "dir/" name the same tree
+                parent = p.rstrip("/")
+                while parent and parent not in found_roots:
+                    parent = self._parent(parent)
+                if parent:
+                    continue
+                out.update(self.find(p, maxdepth=maxdepth, withdirs=True, sort=False))
+                if maxdepth is None:
+                    found_roots.add(p.rstrip("/"))
+            if p not in out and (recursive is False or self.exists(p)):
+                # should only check once, for the root
+                out.add(p)
+
+    def _iter_listing(
+        self,
+        bucket: str,
+        prefix: str,
+        delimiter: Optional[str] = None,
+        max_keys: int = LS_OPERATION_DEFAULT_MAX_ITEMS,
+        start_after: Optional[str] = None,
+    ) -> Generator[ListObjectType2Output, None, None]:
+        """Yield the pages of the listing of prefix one by one."""
+        # built once, only the continuation token changes between the pages
+        kwargs = {
+            "prefix": prefix,
+            "start_after": start_after,
+            "delimiter": delimiter,
+            "max_keys": max_keys,
+            "continuation_token": "",
+        }
+        is_truncated = True
+        while is_truncated:
+            resp = retryable_func_executor(
+                self.tos_client.list_objects_type2,
+                args=(bucket,),
+                kwargs=kwargs,
+                max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
+            )
+            is_truncated = resp.is_truncated
+            kwargs["continuation_token"] = resp.next_continuation_token
+            yield resp
+
+    def _list_after(
+        self, bucket: str, prefix: str, last_key: str, max_items: int
+    ) -> Generator[Union[CommonPrefixInfo, ListedObject], None, None]:
+        """List the objects under prefix after last_key, subtrees concurrently.
+
+        The subtrees are found by a shallow listing of prefix, the ones ending
+        before last_key are skipped and the one holding it resumes after it.
+        """
+        contents, common_prefixes = self._drain_listing(bucket, prefix, "/", max_items)
+        subtrees: List[Tuple[str, Optional[str]]] = []
+        for common_prefix in common_prefixes:
+            if last_key.startswith(common_prefix.prefix):
+                subtrees.append((common_prefix.prefix, last_key))
+            elif common_prefix.prefix > last_key:
+                subtrees.append((common_prefix.prefix, None))
+
+        yield from (obj for obj in contents if obj.key > last_key)
+        yield from self._list_prefixes(bucket, subtrees, "", max_items)
+
+    def _list_prefixes(
+        self,
+        bucket: str,
+        prefixes: List[Tuple[str, Optional[str]]],
+        delimiter: str,
+        max_items: int,
+        descend: bool = False,
+    ) -> Generator[Union[CommonPrefixInfo, ListedObject], None, None]:
+        """List the (prefix, start_after) pairs concurrently, page by page each.
+
+        The entries are yielded as each listing completes, the pending ones are
+        cancelled if the consumer stops early. If descend is True, the common
+        prefixes found are listed as well.
+        """
+        if not prefixes:
+            return
+
+        # at most max_parallel_listings of them in flight on the shared pool
+        queued = deque(prefixes)
+        pending: Set[Future] = set()
+        try:
+            while queued or pending:
+                while queued and len(pending) < self.max_parallel_listings:
+                    p, start_after = queued.popleft()
+                    pending.add(
+                        self._listing_executor.submit(
+                            self._drain_listing,
+                            bucket,
+                            p,
+                            delimiter,
+                            max_items,
+                            start_after,
+                        )
+                    )
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    contents, common_prefixes = future.result()
+                    yield from contents
+                    if descend:
+                        yield from common_prefixes
+                        queued.extend((c.prefix, None) for c in common_prefixes)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _iter_pages_ahead(
+        self, fetch_page: Callable[[str], ListObjectType2Output]
+    ) -> Generator[ListObjectType2Output, None, None]:
+        """Yield the listing pages, the next one requested in the background.
+
+        The next page is fetched on the listing pool while the caller consumes
+        the current one.
+        """
+        future: Optional[Future] = self._listing_executor.submit(fetch_page, "")
+        try:
+            while future is not None:
+                resp = future.result()
+                future = (
+                    self._listing_executor.submit(
+                        fetch_page, resp.next_continuation_token
+                    )
+                    if resp.is_truncated
+                    else None
                 )
+                yield resp
+        finally:
+            if future is not None:
+                future.cancel()
 
-            # Preferentially delete subpaths with longer keys
-            for obj in sorted(deleting_objects, key=lambda x: len(x.key), reverse=True):
-                _call_delete_object(obj)
+    def _drain_listing(
+        self,
+        bucket: str,
+        prefix: str,
+        delimiter: str,
+        max_items: int,
+        start_after: Optional[str] = None,
+    ) -> Tuple[List[ListedObject], List[CommonPrefixInfo]]:
+        contents: List[ListedObject] = []
+        common_prefixes: List[CommonPrefixInfo] = []
+        for resp in self._iter_listing(
+            bucket, prefix, delimiter, max_items, start_after=start_after
+        ):
+            contents.extend(resp.contents)
+            common_prefixes.extend(resp.common_prefixes)
+        return contents, common_prefixes
 
     def _list_and_collect_objects(
         self,
@@ -1490,29 +1961,11 @@ class TosFileSystem(FsspecCompatibleFS):
 
         collected_keys = {obj.key for obj in collected_objects}
 
-        is_truncated = True
-        continuation_token = ""
-
-        while is_truncated:
-
-            def _call_list_objects_type2(
-                continuation_token: str = continuation_token, prefix: str = prefix
-            ) -> ListObjectType2Output:
-                return self.tos_client.list_objects_type2(
-                    bucket,
-                    prefix=prefix,
-                    max_keys=LS_OPERATION_DEFAULT_MAX_ITEMS,
-                    continuation_token=continuation_token,
-                    delimiter="/" if bucket_type == TOS_BUCKET_TYPE_HNS else None,
-                )
-
-            resp = retryable_func_executor(
-                _call_list_objects_type2,
-                max_retry_num=self.max_retry_num,
-            )
-            is_truncated = resp.is_truncated
-            continuation_token = resp.next_continuation_token
-
+        for resp in self._iter_listing(
+            bucket,
+            prefix,
+            delimiter="/" if bucket_type == TOS_BUCKET_TYPE_HNS else None,
+        ):
             for obj in resp.contents:
                 key = obj.key if hasattr(obj, "key") else obj.prefix
                 if key not in collected_keys:
@@ -1531,6 +1984,212 @@ class TosFileSystem(FsspecCompatibleFS):
 
         return collected_objects
 
+    def _mkdir_with_parents(self, bucket: str, key: str) -> None:
+        parts = key.strip("/").split("/")
+        dirs = ["/".join(parts[: i + 1]) for i in range(len(parts))]
+        ancestors = [bucket] + [f"{bucket}/{d}" for d in dirs[:-1]]
+
+        def _dir_exists(path: str) -> bool:
+            return self._recently_created(path) or self.exists(path)
+
+        existing = self._listing_executor.map(_dir_exists, ancestors)
+        if not existing[0]:
+            raise TosfsError(f"Cannot create a bucket {bucket} using mkdir api.")
+
+        deepest = max(i for i, exist in enumerate(existing) if exist)
+        missing = [d + "/" for d in dirs[deepest:]]
+        if self._is_hns_bucket(bucket):
+            # hierarchical buckets need each parent in place before its child
+            for d in missing:
+                self._put_object(bucket, d)
+        else:
+            self._executor.map(functools.partial(self._put_object, bucket), missing)
+        self._remember_created([f"{bucket}/{d}" for d in dirs[deepest:-1]])
+
+    def _remember_created(self, dir_paths: List[str]) -> None:
+        if not self.stat_cache_ttl:
+            return
+        now = time.monotonic()
+        with self._stat_cache_lock:
+            for dir_path in dir_paths:
+                _put_evicting_oldest(self._created_dirs, dir_path, now)
+
+    def _recently_created(self, dir_path: str) -> bool:
+        """Tell whether this instance put the marker of the directory lately.
+
+        Other clients may have removed it since, so it is trusted only for the
+        time to live of the stat cache.
+        """
+        created = self._created_dirs.get(dir_path)
+        return bool(
+            created is not None
+            and self.stat_cache_ttl
+            and time.monotonic() - created < self.stat_cache_ttl
+        )
+
+    def _put_file_multipart(
+        self,
+        bucket: str,
+        key: str,
+        lpath: str,
+        size: int,
+        content_type: Optional[str],
+    ) -> None:
+        """Upload a local file with its parts uploaded in parallel."""
+        mpu = retryable_func_executor(
+            lambda: self.tos_client.create_multipart_upload(
+                bucket, key, content_type=content_type
+            ),
+            max_retry_num=self.max_retry_num,
+            retry_budget=self._retry_budget,
+        )
+
+        def _upload_part(part_number: int, offset: int, part_size: int) -> PartInfo:
+            out = retryable_func_executor(
+                lambda: self.tos_client.upload_part_from_file(
+                    bucket,
+                    key,
+                    mpu.upload_id,
+                    part_number,
+                    file_path=lpath,
+                    offset=offset,
+                    part_size=part_size,
+                ),
+                max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
+            )
+            return PartInfo(
+                part_number=part_number,
+                etag=out.etag,
+                part_size=part_size,
+                offset=None,
+                hash_crc64_ecma=None,
+                is_completed=None,
+            )
+
+        part_size = min(self.multipart_size, PART_MAX_SIZE)
+        try:
+            parts = self._run_in_pool(
+                _upload_part,
+                [
+                    (i + 1, first, last - first + 1)
+                    for i, (first, last) in enumerate(get_brange(size, part_size))
+                ],
+            )
+
+            retryable_func_executor(
+                lambda: self.tos_client.complete_multipart_upload(
+                    bucket, key, mpu.upload_id, parts=parts
+                ),
+                max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
+            )
+        except Exception as e:
+            retryable_func_executor(
+                lambda: self.tos_client.abort_multipart_upload(
+                    bucket, key, mpu.upload_id
+                ),
+                max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
+            )
+            raise e
+
+    def _get_file_first_part(
+        self,
+        bucket: str,
+        key: str,
+        version_id: Optional[str],
+        lpath: str,
+        **kwargs: Any,
+    ) -> Tuple[int, int, str]:
+        """Download the first part of the object into lpath.
+
+        The response of the first part also tells the size of the object, so no
+        extra metadata request is needed. An object smaller than the multipart
+        threshold is downloaded by this request alone. Returns the object size,
+        the number of bytes written and the etag of the object.
+        """
+        first_part_size = max(self.multipart_size, self.multipart_threshold)
+        try:
+            resp = self.tos_client.get_object(
+                bucket,
+                key,
+                version_id=version_id,
+                range_start=0,
+                range_end=min(first_part_size, PART_MAX_SIZE) - 1,
+                **kwargs,
+            )
+        except TosServerError as e:
+            if e.status_code != INVALID_RANGE_CODE:
+                raise e
+            # only an empty object has no byte in the range
+            open(lpath, "wb").close()
+            return 0, 0, ""
+
+        size = (
+            int(resp.content_range.rpartition("/")[2])
+            if resp.content_range
+            else resp.content_length
+        )
+        with open(lpath, "wb") as f:
+            if size > resp.content_length and hasattr(os, "posix_fallocate"):
+                # reserve the blocks of the remaining parts up front
+                os.posix_fallocate(f.fileno(), 0, size)
+            pipe_chunks(
+                resp.content,
+                f.write,
+                GET_OBJECT_OPERATION_DEFAULT_READ_CHUNK_SIZE,
+                GET_OBJECT_OPERATION_PREFETCH_CHUNKS,
+            )
+        return size, resp.content_length, resp.etag
+
+    def _get_file_multipart(
+        self,
+        bucket: str,
+        key: str,
+        version_id: Optional[str],
+        lpath: str,
+        size: int,
+        *,
+        start: int,
+        etag: str,
+        **kwargs: Any,
+    ) -> None:
+        def _download_part(fd: int, first: int, last: int) -> None:
+            # a part of another version of the object fails with 412
+            resp = self.tos_client.get_object(
+                bucket,
+                key,
+                version_id=version_id,
+                if_match=etag,
+                range_start=first,
+                range_end=last,
+                **kwargs,
+            )
+            offset = first
+
+            def _write(chunk: bytes) -> None:
+                nonlocal offset
+                pwrite_all(fd, chunk, offset)
+                offset += len(chunk)
+
+            pipe_chunks(
+                resp.content,
+                _write,
+                GET_OBJECT_OPERATION_DEFAULT_READ_CHUNK_SIZE,
+                GET_OBJECT_OPERATION_PREFETCH_CHUNKS,
+            )
+
+        part_size = min(self.multipart_size, PART_MAX_SIZE)
+        with open(lpath, "r+b", buffering=0) as f:
+            self._run_parts(
+                _download_part,
+                [
+                    (f.fileno(), start + first, start + last)
+                    for first, last in get_brange(size - start, part_size)
+                ],
+            )
+
     def _copy_basic(self, path1: str, path2: str, **kwargs: Any) -> None:
         """Copy file between locations on tos.
 
@@ -1550,8 +2209,56 @@ class TosFileSystem(FsspecCompatibleFS):
                 src_version_id=ver1,
             ),
             max_retry_num=self.max_retry_num,
+            retry_budget=self._retry_budget,
         )
 
+    def _run_parts(
+        self, func: Callable[..., Any], part_args: Sequence[Tuple]
+    ) -> List[Any]:
+        """Run the part operations concurrently, each with its own retries."""
+
+        def _run_part(*args: Any) -> Any:
+            return retryable_func_executor(
+                func,
+                args=args,
+                max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
+            )
+
+        return self._run_in_pool(_run_part, part_args)
+
+    def _run_in_pool(
+        self, func: Callable[..., Any], args_list: Sequence[Tuple]
+    ) -> List[Any]:
+        """Run func over the argument tuples on the shared pool.
+
+        The results keep the order of ``args_list``. On the first failure the
+        calls that have not started yet are cancelled, the running ones are
+        waited for, then the error is raised. When called from a pool thread
+        the calls run inline, as waiting on the pool there could deadlock it.
+        """
+        if in_pool_thread():
+            return [func(*args) for args in args_list]
+
+        executor = self._get_executor()
+        futures = [executor.submit(func, *args) for args in args_list]
+        try:
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+    def _get_executor(self) -> SharedThreadPool:
+        """Return the thread pool shared by the part and batch operations.
+
+        The pool is created on first use, and again in a forked child, which
+        does not inherit the threads of the parent. It is shut down once the
+        filesystem is collected or at interpreter exit. Work submitted to it
+        from a pool thread runs inline.
+        """
+        return self._executor
+
     def _copy_etag_preserved(
         self, path1: str, path2: str, size: int, total_parts: int, **kwargs: Any
     ) -> None:
@@ -1565,56 +2272,44 @@ class TosFileSystem(FsspecCompatibleFS):
             mpu = retryable_func_executor(
                 lambda: self.tos_client.create_multipart_upload(bucket2, key2),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
             upload_id = mpu.upload_id
 
-            parts = []
-            brange_first = 0
-
-            for i in range(1, total_parts + 1):
-                part_size = min(size - brange_first, PART_MAX_SIZE)
-                brange_last = brange_first + part_size - 1
-                if brange_last > size:
-                    brange_last = size - 1
-
-                def _call_upload_part_copy(
-                    i: int = i,
-                    brange_first: int = brange_first,
-                    brange_last: int = brange_last,
-                ) -> UploadPartCopyOutput:
-                    return self.tos_client.upload_part_copy(
-                        bucket=bucket2,
-                        key=key2,
-                        part_number=i,
-                        upload_id=upload_id,
-                        src_bucket=bucket1,
-                        src_key=key1,
-                        copy_source_range_start=brange_first,
-                        copy_source_range_end=brange_last,
-                    )
-
-                part = retryable_func_executor(
-                    _call_upload_part_copy,
-                    args=(i, brange_first, brange_last),
-                    max_retry_num=self.max_retry_num,
+            def _call_upload_part_copy(
+                i: int, brange_first: int, brange_last: int
+            ) -> UploadPartCopyOutput:
+                return self.tos_client.upload_part_copy(
+                    bucket=bucket2,
+                    key=key2,
+                    part_number=i,
+                    upload_id=upload_id,
+                    src_bucket=bucket1,
+                    src_key=key1,
+                    copy_source_range_start=brange_first,
+                    copy_source_range_end=brange_last,
                 )
-                parts.append(
-                    PartInfo(
-                        part_number=part.part_number,
-                        etag=part.etag,
-                        part_size=size,
-                        offset=None,
-                        hash_crc64_ecma=None,
-                        is_completed=None,
-                    )
+
+            part_ranges = list(get_part_ranges(size, total_parts, PART_MAX_SIZE))
+
+            parts = [
+                PartInfo(
+                    part_number=part.part_number,
+                    etag=part.etag,
+                    part_size=size,
+                    offset=None,
+                    hash_crc64_ecma=None,
+                    is_completed=None,
                 )
-                brange_first += part_size
+                for part in self._run_parts(_call_upload_part_copy, part_ranges)
+            ]
 
             retryable_func_executor(
                 lambda: self.tos_client.complete_multipart_upload(
                     bucket2, key2, upload_id, parts
                 ),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
         except Exception as e:
             retryable_func_executor(
@@ -1622,6 +2317,7 @@ class TosFileSystem(FsspecCompatibleFS):
                     bucket2, key2, upload_id
                 ),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
             raise TosfsError(f"Copy failed ({path1} -> {path2}): {e}") from e
 
@@ -1652,6 +2348,7 @@ class TosFileSystem(FsspecCompatibleFS):
             mpu = retryable_func_executor(
                 lambda: self.tos_client.create_multipart_upload(bucket2, key2),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
             upload_id = mpu.upload_id
 
@@ -1669,14 +2366,15 @@ class TosFileSystem(FsspecCompatibleFS):
                     copy_source_range_end=brange_last,
                 )
 
-            out = [
-                retryable_func_executor(
-                    _call_upload_part_copy,
-                    args=(i, brange_first, brange_last),
-                    max_retry_num=self.max_retry_num,
-                )
-                for i, (brange_first, brange_last) in enumerate(get_brange(size, block))
-            ]
+            out = self._run_parts(
+                _call_upload_part_copy,
+                [
+                    (i, brange_first, brange_last)
+                    for i, (brange_first, brange_last) in enumerate(
+                        get_brange(size, block)
+                    )
+                ],
+            )
 
             parts = [
                 PartInfo(
@@ -1695,6 +2393,7 @@ class TosFileSystem(FsspecCompatibleFS):
                     bucket2, key2, upload_id, parts
                 ),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
         except Exception as e:
             retryable_func_executor(
@@ -1702,45 +2401,124 @@ class TosFileSystem(FsspecCompatibleFS):
                     bucket2, key2, upload_id
                 ),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
             raise TosfsError(f"Copy failed ({path1} -> {path2}): {e}") from e
 
     def _find_file_dir(
-        self, key: str, path: str, prefix: str, withdirs: bool, kwargs: Any
+        self,
+        key: str,
+        path: str,
+        prefix: str,
+        withdirs: bool,
+        kwargs: Any,
+        *,
+        shards: Optional[Sequence[str]] = None,
     ) -> List[dict]:
-        out = self._ls_dirs_and_files(
-            path,
-            delimiter="",
-            include_self=True,
-            prefix=prefix,
-            recursive=True,
-        )
+        def _list(shard_prefix: str) -> List[dict]:
+            return self._ls_dirs_and_files(
+                path,
+                delimiter="",
+                include_self=True,
+                prefix=shard_prefix,
+                recursive=True,
+            )
+
+        if shards:
+            merged: dict = {}
+            for listing in self._listing_executor.map(
+                _list, [prefix + s for s in shards]
+            ):
+                for info in listing:
+                    merged.setdefault(info["name"], info)
+            out = list(merged.values())
+        else:
+            out = _list(prefix)
+        if out and not prefix and self.dircache.use_listings_cache:
+            self._fill_dircache(path, out)
         if not out and key:
             try:
                 out = [self.info(path)]
             except FileNotFoundError:
                 out = []
 
-        dirs = {
-            self._parent(o["name"]): {
-                "Key": self._parent(o["name"]).rstrip("/"),
+        if withdirs:
+            out.extend(self._implied_dirs(path, out))
+        else:
+            out = [o for o in out if o["type"] == "file"]
+
+        return out
+
+    def _implied_dirs(self, path: str, entries: List[dict]) -> List[dict]:
+        """Return the parent directories of the entries that have no entry."""
+        names = {o["name"] for o in entries}
+        dirs: Dict[str, dict] = {}
+        for o in entries:
+            parent = self._parent(o["name"])
+            if len(path) <= len(parent) and parent not in names:
+                dirs.setdefault(
+                    parent,
+                    {
+                        "Key": parent,
+                        "Size": 0,
+                        "size": 0,
+                        "name": parent,
+                        "type": "directory",
+                    },
+                )
+        return list(dirs.values())
+
+    def _cached_info(self, path: str) -> Optional[dict]:
+        """Look up the info of path in the cached listings.
+
+        Returns None if no cached listing tells about the path, raises
+        FileNotFoundError if the listing of its parent is cached without it.
+        """
+        if path in self.dircache:
+            # only the listings of existing directories are cached
+            return {
+                "name": path,
+                "Key": path,
                 "Size": 0,
                 "size": 0,
-                "name": self._parent(o["name"]).rstrip("/"),
                 "type": "directory",
             }
-            for o in out
-            if len(path) <= len(self._parent(o["name"]))
-        }
+        try:
+            siblings = self.dircache[self._parent(path)]
+        except KeyError:
+            return None
+        for info in siblings:
+            if info["name"] == path:
+                return info
+        raise FileNotFoundError(path)
 
-        if withdirs:
-            for dir_info in dirs.values():
-                if dir_info not in out:
-                    out.append(dir_info)
-        else:
-            out = [o for o in out if o["type"] == "file"]
+    def _fill_dircache(self, path: str, entries: List[dict]) -> None:
+        """Cache the listings of all the directories under path.
+
+        The entries are the result of a recursive listing of path, the
+        directories that have no marker object are derived from the names.
+        """
+        listings: Dict[str, Dict[str, dict]] = {}
+        for entry in entries:
+            name = entry["name"].rstrip("/")
+            info = entry
+            while len(name) > len(path):
+                parent = self._parent(name)
+                siblings = listings.setdefault(parent, {})
+                if name in siblings:
+                    break
+                siblings[name] = info
+                name = parent
+                info = {
+                    "Key": name,
+                    "Size": 0,
+                    "size": 0,
+                    "name": name,
+                    "type": "directory",
+                }
 
-        return sorted(out, key=lambda x: x["name"])
+        for parent, children in listings.items():
+            self.dircache[parent] = list(children.values())
 
     def _open_remote_file(
         self,
@@ -1762,6 +2540,7 @@ class TosFileSystem(FsspecCompatibleFS):
                     **kwargs,
                 ),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
         except TosServerError as e:
             if e.status_code == INVALID_RANGE_CODE:
@@ -1810,6 +2589,7 @@ class TosFileSystem(FsspecCompatibleFS):
             retryable_func_executor(
                 lambda: self.tos_client.head_bucket(bucket),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
             return self._fill_bucket_info(bucket)
         except TosClientError as e:
@@ -1860,10 +2640,7 @@ class TosFileSystem(FsspecCompatibleFS):
 
         """
         try:
-            out = retryable_func_executor(
-                lambda: self.tos_client.head_object(bucket, key, version_id=version_id),
-                max_retry_num=self.max_retry_num,
-            )
+            out = self._head_object(bucket, key, version_id=version_id)
             return {
                 "ETag": out.etag or "",
                 "LastModified": out.last_modified or "",
@@ -1891,27 +2668,40 @@ class TosFileSystem(FsspecCompatibleFS):
         return None
 
     def _get_dir_info(self, bucket: str, key: str, fullpath: str) -> Optional[dict]:
+        dir_info = {
+            "name": fullpath,
+            "Key": fullpath,
+            "Size": 0,
+            "size": 0,
+            "type": "directory",
+        }
+        if key and self._is_fns_bucket(bucket):
+            # the file status of a prefix answers whether anything is under it,
+            # and is shared through the stat cache with isdir
+            try:
+                self._get_file_status(bucket, canonical_dir(key))
+            except TosServerError as e:
+                if e.status_code == TOS_SERVER_STATUS_CODE_NOT_FOUND:
+                    return None
+                raise e
+            return dir_info
+
         try:
             # We check to see if the path is a directory by attempting to list its
             # contexts. If anything is found, it is indeed a directory
             out = retryable_func_executor(
                 lambda: self.tos_client.list_objects_type2(
                     bucket,
-                    prefix=key.rstrip("/") + "/" if key else "",
+                    prefix=canonical_dir(key) if key else "",
                     delimiter="/",
                     max_keys=1,
                 ),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
 
             if out.key_count > 0 or out.contents or out.common_prefixes:
-                return {
-                    "name": fullpath,
-                    "Key": fullpath,
-                    "Size": 0,
-                    "size": 0,
-                    "type": "directory",
-                }
+                return dir_info
 
             return None
         except (TosClientError, TosServerError) as e:
@@ -1954,6 +2744,7 @@ class TosFileSystem(FsspecCompatibleFS):
             retryable_func_executor(
                 lambda: self.tos_client.head_bucket(bucket),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
             return True
         except TosClientError as e:
@@ -1993,7 +2784,9 @@ class TosFileSystem(FsspecCompatibleFS):
         """
         try:
             resp = retryable_func_executor(
-                lambda: self.tos_client.list_buckets(), max_retry_num=self.max_retry_num
+                lambda: self.tos_client.list_buckets(),
+                max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
         except (TosClientError, TosServerError) as e:
             raise e
@@ -2013,15 +2806,19 @@ class TosFileSystem(FsspecCompatibleFS):
         recursive: bool = False,
     ) -> List[dict]:
         bucket, key, _ = self._split_path(path)
-        if not prefix:
-            prefix = ""
         if key:
-            prefix = key.lstrip("/") + "/" + prefix
+            prefix = f"{key.lstrip('/')}/{prefix or ''}"
+        elif not prefix:
+            prefix = ""
 
         logger.debug("Get directory listing for %s", path)
-        dirs = []
-        files = []
+        dirs: List[dict] = []
+        files: List[dict] = []
         seen_names = set()
+        # bound once, they run for every listed entry
+        fill_dir_info = self._fill_dir_info
+        fill_file_info = self._fill_file_info
+        see = seen_names.add
 
         for obj in self._ls_objects(
             bucket,
@@ -2032,25 +2829,18 @@ class TosFileSystem(FsspecCompatibleFS):
             versions=versions,
             recursive=recursive,
         ):
-            if isinstance(obj, CommonPrefixInfo):
-                dir_info = self._fill_dir_info(bucket, obj)
-                dir_name = dir_info["name"]
-                if dir_name not in seen_names:
-                    dirs.append(dir_info)
-                    seen_names.add(dir_name)
+            if type(obj) is CommonPrefixInfo:
+                info, entries = fill_dir_info(bucket, obj), dirs
             elif obj.key.endswith("/"):
-                dir_info = self._fill_dir_info(bucket, None, obj.key)
-                dir_name = dir_info["name"]
-                if dir_name not in seen_names:
-                    dirs.append(dir_info)
-                    seen_names.add(dir_name)
+                info, entries = fill_dir_info(bucket, None, obj.key), dirs
             else:
-                file_info = self._fill_file_info(obj, bucket, versions)
-                file_name = file_info["name"]
-                if file_name not in seen_names:
-                    files.append(file_info)
-                    seen_names.add(file_name)
-        files += dirs
+                info, entries = fill_file_info(obj, bucket, versions), files
+            name = info["name"]
+            if name not in seen_names:
+                see(name)
+                entries.append(info)
+        # the files come first, then the directories
+        files.extend(dirs)
 
         return files
 
@@ -2063,63 +2853,49 @@ class TosFileSystem(FsspecCompatibleFS):
         include_self: bool = False,
         versions: bool = False,
         recursive: bool = False,
-    ) -> List[Union[CommonPrefixInfo, ListedObject, ListedObjectVersion]]:
+    ) -> Generator[
+        Union[CommonPrefixInfo, ListedObject, ListedObjectVersion], None, None
+    ]:
+        """Yield the listed objects and common prefixes page by page."""
         if versions:
             raise ValueError(
                 "versions cannot be specified if the filesystem is "
                 "not version aware."
             )
 
-        bucket_type = self._get_bucket_type(bucket)
-        all_results = []
-
-        if recursive and bucket_type == TOS_BUCKET_TYPE_HNS:
-
-            def _recursive_list(bucket: str, prefix: str) -> None:
-                resp = retryable_func_executor(
-                    lambda: self.tos_client.list_objects_type2(
-                        bucket,
-                        prefix=prefix,
-                        delimiter="/",
-                        max_keys=max_items,
-                    ),
-                    max_retry_num=self.max_retry_num,
-                )
-
-                all_results.extend(resp.contents + resp.common_prefixes)
-                for common_prefix in resp.common_prefixes:
-                    _recursive_list(bucket, common_prefix.prefix)
-
-            _recursive_list(bucket, prefix)
-        else:
-            is_truncated = True
-
-            continuation_token = ""
-            while is_truncated:
-
-                def _call_list_objects_type2(
-                    continuation_token: str = continuation_token,
-                ) -> ListObjectType2Output:
-                    return self.tos_client.list_objects_type2(
-                        bucket,
-                        prefix,
-                        start_after=prefix if not include_self else None,
-                        delimiter=delimiter,
-                        max_keys=max_items,
-                        continuation_token=continuation_token,
-                    )
-
-                resp = retryable_func_executor(
-                    _call_list_objects_type2,
-                    args=(continuation_token,),
-                    max_retry_num=self.max_retry_num,
-                )
-                is_truncated = resp.is_truncated
-                continuation_token = resp.next_continuation_token
+        if recursive and self._get_bucket_type(bucket) == TOS_BUCKET_TYPE_HNS:
+            # the hierarchy can only be listed level by level
+            yield from self._list_prefixes(
+                bucket, [(prefix, None)], "/", max_items, descend=True
+            )
+            return
 
-                all_results.extend(resp.contents + resp.common_prefixes)
+        pages = self._iter_listing(
+            bucket,
+            prefix,
+            delimiter,
+            max_items,
+            start_after=prefix if not include_self else None,
+        )
+        resp = next(pages)
+        yield from resp.contents
+        yield from resp.common_prefixes
+        if (
+            resp.is_truncated
+            and recursive
+            and not delimiter
+            and self.max_parallel_listings > 1
+        ):
+            # a large flat listing, drain the rest one subtree per request
+            pages.close()
+            yield from self._list_after(
+                bucket, prefix, resp.contents[-1].key, max_items
+            )
+            return
 
-        return all_results
+        for resp in pages:
+            yield from resp.contents
+            yield from resp.common_prefixes
 
     def _prefix_search_for_exists(self, bucket: str, key: str) -> bool:
         bucket_type = self._get_bucket_type(bucket)
@@ -2128,11 +2904,12 @@ class TosFileSystem(FsspecCompatibleFS):
             resp = retryable_func_executor(
                 lambda: self.tos_client.list_objects_type2(
                     bucket,
-                    key.rstrip("/") + "/",
-                    start_after=key.rstrip("/") + "/",
+                    canonical_dir(key),
+                    start_after=canonical_dir(key),
                     max_keys=1,
                 ),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
             return len(resp.contents) > 0
         elif bucket_type == TOS_BUCKET_TYPE_HNS:
@@ -2146,6 +2923,7 @@ class TosFileSystem(FsspecCompatibleFS):
                         max_keys=1,
                     ),
                     max_retry_num=self.max_retry_num,
+                    retry_budget=self._retry_budget,
                 )
                 if len(resp.contents) > 0:
                     return True
@@ -2157,18 +2935,41 @@ class TosFileSystem(FsspecCompatibleFS):
             resp = retryable_func_executor(
                 lambda: self.tos_client.list_objects_type2(
                     bucket,
-                    key.rstrip("/") + "/",
+                    canonical_dir(key),
                     delimiter="/",
                     max_keys=1,
                 ),
                 max_retry_num=self.max_retry_num,
+                retry_budget=self._retry_budget,
             )
             if len(resp.contents) > 0:
                 return True
-            return search_in_common_prefixes(bucket, key.rstrip("/") + "/")
+            return search_in_common_prefixes(bucket, canonical_dir(key))
         else:
             raise ValueError(f"Unsupported bucket type {bucket_type}")
 
+    @classmethod
+    def _strip_protocol(cls, path: Any) -> Any:
+        if isinstance(path, str):
+            return cls._strip_str_protocol(path)
+        return super()._strip_protocol(path)
+
+    @classmethod
+    @functools.lru_cache(maxsize=PATH_CACHE_MAX_SIZE)
+    def _strip_str_protocol(cls, path: str) -> str:
+        return super(TosFileSystem, cls)._strip_protocol(path)
+
+    @classmethod
+    @functools.lru_cache(maxsize=PATH_CACHE_MAX_SIZE)
+    def _parse_path(cls, path: str) -> Tuple[str, str, Optional[str]]:
+        path = cls._strip_protocol(path).lstrip("/")
+        if "/" not in path:
+            return path, "", None
+
+        bucket, keypart = find_bucket_key(path)
+        key, _, version_id = keypart.partition("?versionId=")
+        return bucket, key, version_id
+
     def _split_path(self, path: str) -> Tuple[str, str, Optional[str]]:
         """Normalise tos path string into bucket and key.
 
@@ -2186,13 +2987,9 @@ class TosFileSystem(FsspecCompatibleFS):
         ['mybucket', 'path/to/versioned_file', 'some_version_id']
 
         """
-        path = self._strip_protocol(path)
-        path = path.lstrip("/")
-        if "/" not in path:
-            return path, "", None
-
-        bucket, keypart = find_bucket_key(path)
-        key, _, version_id = keypart.partition("?versionId=")
+        bucket, key, version_id = self._parse_path(path)
+        if version_id is None:
+            return bucket, "", None
 
         if self.tag_enabled:
             self.bucket_tag_mgr.add_bucket_tag(bucket)
@@ -2203,10 +3000,98 @@ class TosFileSystem(FsspecCompatibleFS):
             version_id if self.version_aware and version_id else None,
         )
 
+    @classmethod
+    def _get_client(cls, client_config: dict) -> tos.TosClientV2:
+        digest = hashlib.sha256()
+        for name, value in client_config.items():
+            if name == "credentials_provider" and value is not None:
+                # compared by identity, the cached client keeps it alive
+                digest.update(f"{name}=#{id(value)}\0".encode())
+            else:
+                digest.update(f"{name}={value!r}\0".encode())
+        cache_key = digest.hexdigest()
+        with cls._client_cache_lock:
+            client = cls._client_cache.get(cache_key)
+            if client is None:
+                client = tos.TosClientV2(
+                    **client_config,
+                    max_retry_count=0,
+                    user_agent_product_name="EMR",
+                    user_agent_soft_name="TOSFS",
+                    user_agent_soft_version=Version.version,
+                    user_agent_customized_key_values={"revision": Version.revision},
+                )
+                cls._client_cache[cache_key] = client
+            return client
+
+    def _head_object(
+        self, bucket: str, key: str, version_id: Optional[str] = None
+    ) -> HeadObjectOutput:
+        return self._cached_stat(self._fetch_head_object, bucket, key, version_id)
+
+    def _get_file_status(self, bucket: str, key: str) -> FileStatusOutput:
+        return self._cached_stat(self._fetch_file_status, bucket, key)
+
+    def _cached_stat(self, fetch: Callable[..., Any], *args: Any) -> Any:
+        if not self.stat_cache_ttl:
+            return fetch(*args)
+
+        cache_key = (fetch.__name__, *args)
+        now = time.monotonic()
+        with self._stat_cache_lock:
+            hit = self._stat_cache.get(cache_key)
+        if hit is not None and now - hit[0] < self.stat_cache_ttl:
+            return hit[1]
+
+        out = fetch(*args)
+        with self._stat_cache_lock:
+            _put_evicting_oldest(self._stat_cache, cache_key, (now, out))
+        return out
+
+    def _invalidate_stats(self, path: str) -> None:
+        """Drop the cached metadata of path, its parents and descendants."""
+        bucket, key, _ = self._split_path(path)
+        key = key.rstrip("/")
+        with self._stat_cache_lock:
+            stale = [
+                cache_key
+                for cache_key in self._stat_cache
+                if cache_key[1] == bucket
+                and _is_related_key(cache_key[2].rstrip("/"), key)
+            ]
+            for cache_key in stale:
+                del self._stat_cache[cache_key]
+            stale = [
+                d
+                for d in self._created_dirs
+                if d == path or d.startswith(path + "/")
+            ]
+            for d in stale:
+                del self._created_dirs[d]
+
+    @retryable()
+    def _fetch_head_object(
+        self, bucket: str, key: str, version_id: Optional[str] = None
+    ) -> HeadObjectOutput:
+        return self.tos_client.head_object(bucket, key, version_id=version_id)
+
+    @retryable()
+    def _fetch_file_status(self, bucket: str, key: str) -> FileStatusOutput:
+        return self.tos_client.get_file_status(bucket, key)
+
+    @retryable()
+    def _put_object(self, bucket: str, key: str, **kwargs: Any) -> PutObjectOutput:
+        return self.tos_client.put_object(bucket, key, **kwargs)
+
+    @retryable()
+    def _delete_object(self, bucket: str, key: str) -> DeleteObjectOutput:
+        return self.tos_client.delete_object(bucket, key)
+
     def _get_bucket_type(self, bucket: str) -> str:
         bucket_type = retryable_func_executor(
             lambda: self.tos_client._get_bucket_type(bucket),
             max_retry_num=self.max_retry_num,
+            retry_budget=self._retry_budget,
         )
         if not bucket_type:
             return TOS_BUCKET_TYPE_FNS
@@ -2240,9 +3125,8 @@ class TosFileSystem(FsspecCompatibleFS):
     def _fill_dir_info(
         bucket: str, common_prefix: Optional[CommonPrefixInfo], key: str = ""
     ) -> dict:
-        name = "/".join(
-            [bucket, common_prefix.prefix[:-1] if common_prefix else key]
-        ).rstrip("/")
+        base = common_prefix.prefix[:-1] if common_prefix else key
+        name = f"{bucket}/{base}".rstrip("/")
         return {
             "name": name,
             "Key": name,
@@ -2253,10 +3137,11 @@ class TosFileSystem(FsspecCompatibleFS):
 
     @staticmethod
     def _fill_file_info(obj: ListedObject, bucket: str, versions: bool = False) -> dict:
+        name = f"{bucket}/{obj.key}"
         result = {
-            "Key": f"{bucket}/{obj.key}",
+            "Key": name,
             "size": obj.size,
-            "name": f"{bucket}/{obj.key}",
+            "name": name,
             "type": "file",
             "LastModified": obj.last_modified,
         }
@@ -2335,6 +3220,7 @@ class TosFile(AbstractBufferedFile):
                 head = retryable_func_executor(
                     lambda: self.fs.tos_client.head_object(bucket, key),
                     max_retry_num=self.fs.max_retry_num,
+                    retry_budget=self.fs._retry_budget,
                 )
                 self.append_offset = head.content_length
             except TosServerError as e:
@@ -2343,11 +3229,11 @@ class TosFile(AbstractBufferedFile):
                 else:
                     raise e
 
-        if "w" in mode:
-            # check the local staging dir if not exist, create it
+        if "w" in mode and not fs._staging_dirs_ready:
+            # create the local staging dirs once, on the first write
             for staging_dir in fs.multipart_staging_dirs:
-                if not os.path.exists(staging_dir):
-                    os.makedirs(staging_dir)
+                os.makedirs(staging_dir, exist_ok=True)
+            fs._staging_dirs_ready = True
 
     def _check_init_params(
         self, key: str, path: str, mode: str, block_size: Union[int, str]
@@ -2378,7 +3264,6 @@ class TosFile(AbstractBufferedFile):
             self.autocommit is True.
 
         """
-        bucket, key, _ = self.fs._split_path(self.path)
         if self.buffer:
             logger.debug(
                 "Upload for %s, final=%s, loc=%s, buffer loc=%s",
@@ -2420,8 +3305,10 @@ class TosFile(AbstractBufferedFile):
                         offset=self.append_offset,
                         content=content,
                     ),
+                    retry_budget=self.fs._retry_budget,
                 )
                 self.append_offset = resp.next_append_offset
+                self.fs.invalidate_cache(self.path)
 
     def _fetch_range(self, start: int, end: int) -> bytes:
         if start == end:
@@ -2436,18 +3323,22 @@ class TosFile(AbstractBufferedFile):
         logger.debug("Fetch: %s/%s, %s-%s", self.bucket, self.key, start, end)
 
         def fetch() -> bytes:
-            with io.BytesIO() as temp_buffer:
-                for chunk in self.fs.tos_client.get_object(
+            # joining the chunks sizes the result once and copies each chunk once
+            return b"".join(
+                self.fs.tos_client.get_object(
                     self.bucket,
                     self.key,
                     self.version_id,
                     range_start=start,
                     range_end=end,
-                ):
-                    temp_buffer.write(chunk)
-                return temp_buffer.getvalue()
+                )
+            )
 
-        return retryable_func_executor(fetch, max_retry_num=self.fs.max_retry_num)
+        return retryable_func_executor(
+            fetch,
+            max_retry_num=self.fs.max_retry_num,
+            retry_budget=self.fs._retry_budget,
+        )
 
     def commit(self) -> None:
         """Complete multipart upload or PUT."""
@@ -2460,13 +3351,13 @@ class TosFile(AbstractBufferedFile):
         elif not self.multipart_uploader.staging_part_mgr.staging_files:
             if self.buffer is not None:
                 logger.debug("One-shot upload of %s", self)
-                self.buffer.seek(0)
-                data = self.buffer.read()
+                data = self.buffer.getvalue()
                 retryable_func_executor(
                     lambda: self.fs.tos_client.put_object(
                         self.bucket, self.key, content=data
                     ),
                     max_retry_num=self.fs.max_retry_num,
+                    retry_budget=self.fs._retry_budget,
                 )
             else:
                 raise RuntimeError("No buffer to commit for file %s" % self.path)
@@ -2475,6 +3366,7 @@ class TosFile(AbstractBufferedFile):
             self.multipart_uploader.upload_staged_files()
             self.multipart_uploader.complete_upload()
 
+        self.fs.invalidate_cache(self.path)
         self.buffer = None
 
     def discard(self) -> None:
@@ -18,7 +18,6 @@ import io
 import itertools
 import os
 import tempfile
-from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Optional
 
 from tos.models2 import CreateMultipartUploadOutput, PartInfo
@@ -99,7 +98,9 @@ class MultipartUploader:
         self.part_size = part_size
         self.thread_pool_size = thread_pool_size
         self.multipart_threshold = multipart_threshold
-        self.executor = ThreadPoolExecutor(max_workers=self.thread_pool_size)
+        # the part uploads run on the pool shared by the filesystem, inline
+        # when the file is flushed from one of its threads
+        self.executor = fs._get_executor()
         self.staging_part_mgr = StagingPartMgr(
             part_size, itertools.cycle(fs.multipart_staging_dirs)
         )
@@ -111,6 +112,7 @@ class MultipartUploader:
         self.mpu = retryable_func_executor(
             lambda: self.fs.tos_client.create_multipart_upload(self.bucket, self.key),
             max_retry_num=self.fs.max_retry_num,
+            retry_budget=self.fs._retry_budget,
         )
 
     def upload_multiple_chunks(self, buffer: Optional[io.BytesIO]) -> None:
@@ -154,6 +156,7 @@ class MultipartUploader:
                 content=content,
             ),
             max_retry_num=self.fs.max_retry_num,
+            retry_budget=self.fs._retry_budget,
         )
 
         os.remove(staging_file)
@@ -176,6 +179,7 @@ class MultipartUploader:
                 parts=self.parts,
             ),
             max_retry_num=self.fs.max_retry_num,
+            retry_budget=self.fs._retry_budget,
         )
 
     def abort_upload(self) -> None:
@@ -186,5 +190,6 @@ class MultipartUploader:
                     self.bucket, self.key, self.mpu.upload_id
                 ),
                 max_retry_num=self.fs.max_retry_num,
+                retry_budget=self.fs._retry_budget,
             )
             self.mpu = None
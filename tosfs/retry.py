@@ -13,9 +13,14 @@
 # limitations under the License.
 
 """The module contains retry utility functions for the tosfs stability."""
+import functools
+import logging
 import math
+import random
+import threading
 import time
-from typing import Any, Optional, Tuple, Union
+from contextlib import contextmanager
+from typing import Any, Callable, Generator, Optional, Tuple, Union
 
 import requests
 import urllib3.exceptions
@@ -80,6 +85,13 @@ TOS_CLIENT_RETRYABLE_EXCEPTIONS = {
 MAX_RETRY_NUM = 20
 SLEEP_BASE_SECONDS = 0.1
 SLEEP_MAX_SECONDS = 60
+# the number of retries of a filesystem that may back off at once
+MAX_CONCURRENT_RETRIES = 32
+
+_retry_scope = threading.local()
+
+# the logger configured by tosfs.core, fetched by name to avoid importing core
+logger = logging.getLogger("tosfs")
 
 
 def retryable_func_executor(
@@ -88,28 +100,105 @@ def retryable_func_executor(
     args: Tuple[Any, ...] = (),
     kwargs: Optional[Any] = None,
     max_retry_num: int = MAX_RETRY_NUM,
+    retry_budget: Optional[threading.Semaphore] = None,
+    retry_nested: bool = True,
 ) -> Any:
-    """Retry a function in case of catch errors."""
+    """Retry a function in case of catch errors.
+
+    If retry_budget is given, a slot of it is held while backing off before
+    each new attempt, which bounds the retries waiting at once. If
+    retry_nested is False, the retries of this call cover all of func: the
+    executors nested in it on this thread make a single attempt each, so that
+    the attempts of a single failure are not multiplied.
+    """
     if kwargs is None:
         kwargs = {}
 
+    if getattr(_retry_scope, "covered", False):
+        return func(*args, **kwargs)
+
+    # at least one attempt is made, whatever the retry number
+    max_retry_num = max(1, max_retry_num)
     attempt = 0
 
-    while attempt < max_retry_num:
-        attempt += 1
-        try:
-            return func(*args, **kwargs)
-        except TosError as e:
-            _do_retry(e, func, attempt, max_retry_num)
-        except Exception as e:
-            _do_retry(e, func, attempt, max_retry_num)
+    with _covering_nested_retries(not retry_nested):
+        while attempt < max_retry_num:
+            attempt += 1
+            try:
+                return func(*args, **kwargs)
+            except TosError as e:
+                _do_retry(e, func, attempt, max_retry_num, retry_budget)
+            except Exception as e:
+                _do_retry(e, func, attempt, max_retry_num, retry_budget)
+
+
+def retryable(
+    max_retry_num_attr: str = "max_retry_num",
+    retry_budget_attr: str = "_retry_budget",
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Retry the decorated method in case of catch errors.
+
+    The maximum number of retries and the retry budget are read from the
+    ``max_retry_num_attr`` and ``retry_budget_attr`` attributes of the
+    instance, so the method is wrapped once at class creation instead of
+    building a closure for every call.
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            return retryable_func_executor(
+                func,
+                args=(self, *args),
+                kwargs=kwargs,
+                max_retry_num=getattr(self, max_retry_num_attr),
+                retry_budget=getattr(self, retry_budget_attr, None),
+            )
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def _covering_nested_retries(covering: bool) -> Generator[None, None, None]:
+    """Make the executors nested on this thread attempt once, if covering."""
+    if not covering:
+        yield
+        return
+
+    _retry_scope.covered = True
+    try:
+        yield
+    finally:
+        _retry_scope.covered = False
+
+
+@contextmanager
+def _retry_slot(
+    retry_budget: Optional[threading.Semaphore],
+) -> Generator[None, None, None]:
+    """Hold a slot of the retry budget, if any, while backing off.
+
+    It keeps a burst of failures in parallel transfers from multiplying the
+    load on a degraded service. Only the wait before a new attempt holds the
+    slot, never the attempt itself.
+    """
+    if retry_budget is None:
+        yield
+        return
+
+    with retry_budget:
+        yield
 
 
 def _do_retry(
-    e: Union[TosError, Exception], func: Any, attempt: int, max_retry_num: int
+    e: Union[TosError, Exception],
+    func: Any,
+    attempt: int,
+    max_retry_num: int,
+    retry_budget: Optional[threading.Semaphore] = None,
 ) -> None:
-    from tosfs.core import logger
-
     if attempt >= max_retry_num:
         logger.error("Retry exhausted after %d times.", max_retry_num)
         raise e
@@ -118,7 +207,8 @@ def _do_retry(
         logger.warning("Retry TOS request in the %d times, error: %s", attempt, e)
         try:
             sleep_time = _get_sleep_time(e, attempt)
-            time.sleep(sleep_time)
+            with _retry_slot(retry_budget):
+                time.sleep(sleep_time)
         except InterruptedError as ie:
             raise TosfsError(f"Request {func} interrupted.") from ie
     else:
@@ -178,8 +268,12 @@ def _is_retryable_general_client_exception(e: Optional[Exception]) -> bool:
 
 
 def _get_sleep_time(err: TosError, retry_count: int) -> float:
-    sleep_time = SLEEP_BASE_SECONDS * math.pow(2, retry_count)
-    sleep_time = min(sleep_time, SLEEP_MAX_SECONDS)
+    # full jitter, so that concurrent requests failing together do not retry
+    # in lockstep
+    sleep_time = random.uniform(
+        SLEEP_BASE_SECONDS,
+        min(SLEEP_BASE_SECONDS * math.pow(2, retry_count), SLEEP_MAX_SECONDS),
+    )
     if (
         isinstance(err, TosServerError)
         and (
@@ -191,7 +285,5 @@ def _get_sleep_time(err: TosError, retry_count: int) -> float:
         try:
             sleep_time = max(int(err.header["retry-after"]), int(sleep_time))
         except Exception as e:
-            from tosfs.core import logger
-
-            logger.warning("try to parse retry-after from headers error: {}".format(e))
+            logger.warning("try to parse retry-after from headers error: %s", e)
     return sleep_time
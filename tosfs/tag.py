@@ -241,13 +241,13 @@ class BucketTagMgr:
 
     def add_bucket_tag(self, bucket: str) -> None:
         """Add tag for bucket."""
+        if bucket in self.cached_bucket_set:
+            return
+
         from tosfs.core import logger
 
         collect_bucket_set = {bucket}
 
-        if not collect_bucket_set - self.cached_bucket_set:
-            return
-
         if os.path.exists(TAGGED_BUCKETS_FILE):
             with open(TAGGED_BUCKETS_FILE, "r") as file:
                 tagged_bucket_from_file_set = set(file.read().split(" "))
@@ -47,6 +47,18 @@ def tosfs(_tosfs_env_prepare: None) -> TosFileSystem:
     return tosfs
 
 
+@pytest.fixture(scope="module")
+def cached_tosfs(_tosfs_env_prepare: None) -> TosFileSystem:
+    return TosFileSystem(
+        endpoint=os.environ.get("TOS_ENDPOINT"),
+        region=os.environ.get("TOS_REGION"),
+        credentials_provider=EnvCredentialsProvider(),
+        max_retry_num=1000,
+        use_listings_cache=True,
+        stat_cache_ttl=60,
+    )
+
+
 @pytest.fixture(scope="module")
 def fsspecfs(_tosfs_env_prepare: None) -> Any:
     known_implementations["tos"] = {"class": "tosfs.TosFileSystem"}
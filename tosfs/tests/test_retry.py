@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
 from unittest.mock import Mock
 
 import pytest
@@ -21,7 +22,12 @@ from tos.http import Response
 from urllib3 import HTTPConnectionPool
 from urllib3.exceptions import ProtocolError, ReadTimeoutError
 
-from tosfs.retry import _get_sleep_time, is_retryable_exception
+from tosfs import retry
+from tosfs.retry import (
+    _get_sleep_time,
+    is_retryable_exception,
+    retryable_func_executor,
+)
 
 mock_resp = Mock(spec=requests.Response)
 
@@ -132,3 +138,58 @@ def test_get_sleep_time():
     )
 
     assert _get_sleep_time(err, 1) == sleep_time
+
+
+def test_nested_retry(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(retry.time, "sleep", lambda _: None)
+    calls = {"inner": 0, "outer": 0}
+
+    def inner():
+        calls["inner"] += 1
+        raise ReadTimeoutError(None, message="", url="")
+
+    def outer():
+        calls["outer"] += 1
+        return retryable_func_executor(inner, max_retry_num=3)
+
+    # by default an executor nested in a retried call keeps its own retries
+    with pytest.raises(ReadTimeoutError):
+        retryable_func_executor(outer, max_retry_num=2)
+    assert calls == {"inner": 6, "outer": 2}
+
+    # an outer call covering its nested retries makes them attempt once
+    calls.update(inner=0, outer=0)
+    with pytest.raises(ReadTimeoutError):
+        retryable_func_executor(outer, max_retry_num=2, retry_nested=False)
+    assert calls == {"inner": 2, "outer": 2}
+
+    # the nested executors retry again once the covering call is over
+    calls.update(inner=0, outer=0)
+    with pytest.raises(ReadTimeoutError):
+        retryable_func_executor(inner, max_retry_num=3)
+    assert calls == {"inner": 3, "outer": 0}
+
+
+def test_retry_budget(monkeypatch: pytest.MonkeyPatch):
+    budget = threading.BoundedSemaphore(1)
+
+    def _held() -> bool:
+        if budget.acquire(blocking=False):
+            budget.release()
+            return False
+        return True
+
+    failures = 2
+    sleeps, attempts = [], []
+    monkeypatch.setattr(retry.time, "sleep", lambda _: sleeps.append(_held()))
+
+    def flaky():
+        attempts.append(_held())
+        if len(attempts) <= failures:
+            raise ReadTimeoutError(None, message="", url="")
+        return "ok"
+
+    # the slot is held while backing off, never during an attempt
+    assert retryable_func_executor(flaky, retry_budget=budget) == "ok"
+    assert sleeps == [True, True]
+    assert attempts == [False, False, False]
@@ -11,17 +11,80 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import gc
 import os.path
 import tempfile
+import time
+from typing import Any
 
 import pytest
+from fsspec import AbstractFileSystem
 from tos.exceptions import TosServerError
 
 from tosfs import TosFileSystem
+from tosfs.consts import PATH_CACHE_MAX_SIZE
+from tosfs.core import _put_evicting_oldest
 from tosfs.exceptions import TosfsError
 from tosfs.utils import create_temp_dir, random_str
 
 
+def test_shared_client(tosfs: TosFileSystem) -> None:
+    key, secret = random_str(16), random_str(16)
+
+    def new_fs(**kwargs: int) -> TosFileSystem:
+        return TosFileSystem(
+            key=key,
+            secret=secret,
+            endpoint=os.environ.get("TOS_ENDPOINT"),
+            region=os.environ.get("TOS_REGION"),
+            skip_instance_cache=True,
+            **kwargs,
+        )
+
+    fs1, fs2 = new_fs(), new_fs(default_block_size=8 << 20)
+    fs3 = new_fs(socket_timeout=17)
+    assert fs1.tos_client is fs2.tos_client
+    assert fs1.tos_client is not fs3.tos_client
+    # the cache keys do not hold the secrets
+    assert not any(secret in str(k) for k in TosFileSystem._client_cache)
+
+    # the client is released with the last instance using it
+    cached = len(TosFileSystem._client_cache)
+    del fs1, fs2
+    gc.collect()
+    assert len(TosFileSystem._client_cache) == cached - 1
+
+
+def test_shared_pool() -> None:
+    fs = TosFileSystem(
+        key=os.environ.get("TOS_ACCESS_KEY"),
+        secret=os.environ.get("TOS_SECRET_KEY"),
+        endpoint=os.environ.get("TOS_ENDPOINT"),
+        region=os.environ.get("TOS_REGION"),
+        multipart_thread_pool_size=1,
+        skip_instance_cache=True,
+    )
+
+    # a call made from a pool thread runs inline instead of waiting on the pool
+    def nested(fs: TosFileSystem) -> list:
+        return fs._run_in_pool(lambda i: i, [(1,), (2,)])
+
+    assert fs._run_in_pool(nested, [(fs,), (fs,)]) == [[1, 2], [1, 2]]
+
+    # so does work submitted to the pool directly, e.g. by a multipart upload
+    def submitted(fs: TosFileSystem) -> int:
+        return fs._get_executor().submit(len, "abc").result()
+
+    assert fs._run_in_pool(submitted, [(fs,)]) == [3]
+
+    # the pool is shut down with the filesystem
+    executor = fs._get_executor()
+    del fs
+    gc.collect()
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+
+
 def test_ls_bucket(tosfs: TosFileSystem, bucket: str) -> None:
     assert bucket in tosfs.ls("", detail=False)
     detailed_list = tosfs.ls("", detail=True)
@@ -324,6 +387,35 @@ def test_mkdir(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -> N
     assert tosfs.isdir(f"{bucket}/{temporary_workspace}/notexist/")
 
 
+def test_mkdir_after_external_delete(
+    tosfs: TosFileSystem,
+    cached_tosfs: TosFileSystem,
+    bucket: str,
+    temporary_workspace: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    dir_path = f"{bucket}/{temporary_workspace}/{random_str()}"
+    tosfs.mkdir(dir_path)
+    assert tosfs.isdir(dir_path)
+
+    # removed by another instance, which shares no cache with tosfs
+    cached_tosfs.rmdir(dir_path)
+    tosfs.mkdir(dir_path)
+    assert tosfs.isdir(dir_path)
+
+    # the parent created by cached_tosfs is remembered, then removed by tosfs
+    parent_path = f"{bucket}/{temporary_workspace}/{random_str()}"
+    cached_tosfs.mkdir(f"{parent_path}/{random_str()}")
+    tosfs.rm(parent_path, recursive=True)
+
+    # once the memo expired, the marker of the parent is put again
+    expired = time.monotonic() + cached_tosfs.stat_cache_ttl + 1
+    monkeypatch.setattr(time, "monotonic", lambda: expired)
+    cached_tosfs.mkdir(f"{parent_path}/{random_str()}")
+    _, parent_key, _ = tosfs._split_path(parent_path)
+    tosfs.tos_client.head_object(bucket, f"{parent_key}/")
+
+
 def test_makedirs(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -> None:
     dir_name = random_str()
 
@@ -525,6 +617,32 @@ def test_get_file(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -
             tosfs.get_file(f"{bucket}/{temporary_workspace}/nonexistent", lpath)
 
 
+def test_get_file_multipart(
+    tosfs: TosFileSystem,
+    bucket: str,
+    temporary_workspace: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    rpath = f"{bucket}/{temporary_workspace}/{random_str()}"
+    # the fixture downloads in 4MB parts, leave a partial last part
+    file_content = os.urandom(10 << 20 | 17)
+    tosfs.pipe(rpath, file_content)
+
+    with tempfile.TemporaryDirectory() as local_temp_dir:
+        lpath = f"{local_temp_dir}/{random_str()}"
+        tosfs.get_file(rpath, lpath)
+        with open(lpath, "rb") as f:
+            assert f.read() == file_content
+
+        # no retry and no os.pwrite, as on Windows, still download the file
+        monkeypatch.setattr(tosfs, "max_retry_num", 0)
+        monkeypatch.delattr(os, "pwrite")
+        lpath = f"{local_temp_dir}/{random_str()}"
+        tosfs.get_file(rpath, lpath)
+        with open(lpath, "rb") as f:
+            assert f.read() == file_content
+
+
 def test_walk(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -> None:
     with pytest.raises(ValueError, match="Cannot access all of TOS via path ."):
         tosfs.walk(path="")
@@ -589,6 +707,56 @@ def test_walk(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -> No
     assert walk_results[2][2] == []
 
 
+def test_walk_concurrent(
+    tosfs: TosFileSystem, bucket: str, temporary_workspace: str
+) -> None:
+    root = f"{bucket}/{temporary_workspace}"
+    dir_names = [random_str() for _ in range(3)]
+    for dir_name in dir_names:
+        for sub_dir_name in (random_str(), random_str()):
+            tosfs.makedirs(f"{root}/{dir_name}/{sub_dir_name}")
+            tosfs.touch(f"{root}/{dir_name}/{sub_dir_name}/{random_str()}")
+        tosfs.touch(f"{root}/{dir_name}/{random_str()}")
+
+    def _walk(**kwargs: Any) -> list:
+        return [
+            (path, sorted(dirs), sorted(files))
+            for path, dirs, files in tosfs.walk(root, **kwargs)
+        ]
+
+    with pytest.raises(ValueError, match="max_workers must be at least 1"):
+        _walk(max_workers=0)
+
+    # the concurrent walk visits the same directories as a sequential one
+    sequential = _walk(max_workers=1)
+    assert len(sequential) == 1 + 3 + 6
+    assert sorted(_walk()) == sorted(sequential)
+    assert sorted(_walk(topdown=False)) == sorted(sequential)
+    assert sorted(_walk(maxdepth=2)) == sorted(
+        entry for entry in sequential if entry[0].count("/") <= root.count("/") + 1
+    )
+
+    # every directory comes after its parent top down, before it bottom up
+    paths = [path for path, _, _ in tosfs.walk(root)]
+    assert all(paths.index(os.path.dirname(p)) < paths.index(p) for p in paths[1:])
+    paths = [path for path, _, _ in tosfs.walk(root, topdown=False)]
+    assert all(paths.index(os.path.dirname(p)) > paths.index(p) for p in paths[:-1])
+
+    # pruning dirs in place stops the descent
+    visited = []
+    for path, dirs, _ in tosfs.walk(root):
+        visited.append(path)
+        if path == root:
+            dirs[:] = dir_names[:1]
+    assert len(visited) == 1 + 1 + 2
+    assert all(p == root or p.startswith(f"{root}/{dir_names[0]}") for p in visited)
+
+    for path, dirs, files in tosfs.walk(root, detail=True):
+        assert all(info["type"] == "directory" for info in dirs.values())
+        assert all(info["type"] == "file" for info in files.values())
+        assert path == root or dirs or files
+
+
 def test_find(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -> None:
     with pytest.raises(ValueError, match="Cannot access all of TOS via path ."):
         tosfs.find("")
@@ -820,6 +988,30 @@ def test_glob(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -> No
     )
 
 
+def test_glob_single_level(
+    tosfs: TosFileSystem, bucket: str, temporary_workspace: str
+) -> None:
+    dir_name = random_str()
+    file_name = random_str()
+    root = f"{bucket}/{temporary_workspace}/{dir_name}"
+    tosfs.makedirs(f"{root}/{random_str()}/{random_str()}")
+    tosfs.touch(f"{root}/{file_name}")
+    tosfs.touch(f"{root}/{random_str()}/{file_name}")
+
+    # patterns served by a single listing must match the find based glob
+    for pattern, kwargs in [
+        (f"{root}/*", {}),
+        (f"{root}/{file_name[:-1]}?", {}),
+        (f"{root}/*/", {}),
+        (f"{root}/**", {"maxdepth": 1}),
+        (f"{root}/**/", {"maxdepth": 1}),
+        (f"{root}/missing/*", {}),
+    ]:
+        assert sorted(tosfs.glob(pattern, **kwargs)) == sorted(
+            AbstractFileSystem.glob(tosfs, pattern, **kwargs)
+        ), pattern
+
+
 def test_rm(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -> None:
     file_name = random_str()
     dir_name = random_str()
@@ -855,12 +1047,107 @@ def test_rm(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -> None
     # Test Deletion of Non-Existent Path
     with pytest.raises(FileNotFoundError):
         tosfs.rm(f"{bucket}/{temporary_workspace}/nonexistent")
+    with pytest.raises(FileNotFoundError):
+        tosfs.rm(
+            f"{bucket}/{temporary_workspace}/nonexistent", recursive=True, maxdepth=1
+        )
+    with pytest.raises(FileNotFoundError):
+        tosfs.rm(f"{bucket}/{temporary_workspace}/nonexistent*")
 
     # Test Deletion of Bucket
     with pytest.raises(TosfsError):
         tosfs.rm(bucket)
 
 
+def test_rm_invalidates_cached_listings(
+    cached_tosfs: TosFileSystem, bucket: str, temporary_workspace: str
+) -> None:
+    dir_name = random_str()
+    sub_dir_name = random_str()
+    file_name = random_str()
+    root = f"{bucket}/{temporary_workspace}/{dir_name}"
+    cached_tosfs.touch(f"{root}/{sub_dir_name}/{file_name}")
+
+    # find caches the listings of every directory under root
+    assert cached_tosfs.find(root) == [f"{root}/{sub_dir_name}/{file_name}"]
+    assert cached_tosfs.exists(f"{root}/{sub_dir_name}/{file_name}")
+
+    cached_tosfs.rm(root, recursive=True)
+    assert not cached_tosfs.exists(f"{root}/{sub_dir_name}/{file_name}")
+    assert not cached_tosfs.exists(f"{root}/{sub_dir_name}")
+    assert not cached_tosfs.isdir(f"{root}/{sub_dir_name}")
+
+
+def test_stat_cache(
+    tosfs: TosFileSystem,
+    cached_tosfs: TosFileSystem,
+    bucket: str,
+    temporary_workspace: str,
+) -> None:
+    assert tosfs.stat_cache_ttl is None
+    path = f"{bucket}/{temporary_workspace}/{random_str()}"
+    tosfs.touch(path)
+    assert cached_tosfs.info(path)["type"] == "file"
+
+    # a change made by another instance is seen after the ttl only
+    tosfs.rm(path)
+    assert cached_tosfs.info(path)["type"] == "file"
+    assert not tosfs.exists(path)
+    cached_tosfs.invalidate_cache(path)
+    with pytest.raises(FileNotFoundError):
+        cached_tosfs.info(path)
+
+    # a change made by the instance itself is seen at once
+    cached_tosfs.touch(path)
+    assert cached_tosfs.isfile(path)
+    cached_tosfs.rm(path)
+    assert not cached_tosfs.exists(path)
+    assert not cached_tosfs.isfile(path)
+
+
+def test_stat_cache_eviction() -> None:
+    cache: dict = {}
+    for i in range(PATH_CACHE_MAX_SIZE):
+        _put_evicting_oldest(cache, i, i)
+    # putting an entry again makes it the newest
+    _put_evicting_oldest(cache, 0, 0)
+    _put_evicting_oldest(cache, "new", 0)
+    assert len(cache) == PATH_CACHE_MAX_SIZE
+    assert 0 in cache
+    assert 1 not in cache
+    assert "new" in cache
+
+
+def test_rm_batch(tosfs: TosFileSystem, bucket: str, temporary_workspace: str) -> None:
+    dir_name = random_str()
+    sub_dir_name = random_str()
+    file_names = [random_str() for _ in range(3)]
+    root = f"{bucket}/{temporary_workspace}/{dir_name}"
+
+    # Test Deletion of a List of Paths
+    for file_name in file_names:
+        tosfs.touch(f"{root}/{file_name}")
+    tosfs.rm([f"{root}/{file_name}" for file_name in file_names[:2]])
+    assert not tosfs.exists(f"{root}/{file_names[0]}")
+    assert not tosfs.exists(f"{root}/{file_names[1]}")
+    assert tosfs.exists(f"{root}/{file_names[2]}")
+
+    # Test Deletion of a List with a Missing Path or a Bucket
+    with pytest.raises(FileNotFoundError):
+        tosfs.rm([f"{root}/{file_names[2]}", f"{root}/nonexistent"])
+    with pytest.raises(TosfsError):
+        tosfs.rm([f"{root}/{file_names[2]}", bucket])
+    assert tosfs.exists(f"{root}/{file_names[2]}")
+
+    # Test Deletion with a maxdepth
+    tosfs.makedirs(f"{root}/{sub_dir_name}")
+    tosfs.touch(f"{root}/{sub_dir_name}/{file_names[0]}")
+    tosfs.rm(root, recursive=True, maxdepth=2)
+    assert not tosfs.exists(f"{root}/{file_names[2]}")
+    assert not tosfs.exists(f"{root}/{sub_dir_name}/{file_names[0]}")
+    assert not tosfs.exists(root)
+
+
 ###########################################################
 #                File operation tests                     #
 ###########################################################
@@ -12,10 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
+import os
+import string
+import tempfile
+import threading
+from collections import Counter
+
 import pytest
 
 from tosfs.core import TosFileSystem
-from tosfs.utils import find_bucket_key
+from tosfs.utils import (
+    SharedThreadPool,
+    find_bucket_key,
+    get_part_ranges,
+    pipe_chunks,
+    pwrite_all,
+    random_str,
+)
 
 
 @pytest.mark.parametrize(
@@ -35,3 +49,81 @@ def test_find_bucket_key(
     tosfs: TosFileSystem, input_str: str, expected_output: str
 ) -> None:
     assert find_bucket_key(input_str) == expected_output
+
+
+@pytest.mark.parametrize(
+    ("size", "total_parts", "part_size", "expected_output"),
+    [
+        (10, 3, 4, [(1, 0, 3), (2, 4, 7), (3, 8, 9)]),
+        (8, 2, 4, [(1, 0, 3), (2, 4, 7)]),
+        (1, 1, 4, [(1, 0, 0)]),
+    ],
+)
+def test_get_part_ranges(
+    size: int, total_parts: int, part_size: int, expected_output: list
+) -> None:
+    assert list(get_part_ranges(size, total_parts, part_size)) == expected_output
+
+
+def test_pwrite_all(monkeypatch: pytest.MonkeyPatch) -> None:
+    pwrite = os.pwrite
+    # write at most 3 bytes per call, like a short write would
+    monkeypatch.setattr(os, "pwrite", lambda fd, data, off: pwrite(fd, data[:3], off))
+    with tempfile.TemporaryFile() as f:
+        f.write(b"-" * 12)
+        f.flush()
+        pwrite_all(f.fileno(), b"abcdefgh", 2)
+        f.seek(0)
+        assert f.read() == b"--abcdefgh--"
+
+
+def test_pwrite_all_without_pwrite(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delattr(os, "pwrite")
+    with tempfile.TemporaryFile() as f:
+        f.write(b"-" * 12)
+        f.flush()
+        pwrite_all(f.fileno(), b"abcd", 6)
+        pwrite_all(f.fileno(), b"efgh", 2)
+        f.seek(0)
+        assert f.read() == b"--efghabcd--"
+
+
+def test_pipe_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    data = os.urandom(1000)
+    out: list = []
+    assert pipe_chunks(io.BytesIO(data), out.append, 64, 2) == len(data)
+    assert b"".join(out) == data
+
+    # a pool thread copies the chunks itself, without a reader thread
+    pool = SharedThreadPool(1, "test")
+    pool.map(len, ["warm up"])
+    monkeypatch.setattr(threading, "Thread", None)
+    out.clear()
+    copied = pool.submit(pipe_chunks, io.BytesIO(data), out.append, 64, 2)
+    assert copied.result(timeout=10) == len(data)
+    assert b"".join(out) == data
+    pool.shutdown()
+
+
+def test_shared_thread_pool() -> None:
+    pool = SharedThreadPool(1, "test")
+    assert pool.map(lambda i: i * 2, range(5)) == [0, 2, 4, 6, 8]
+    # nested work runs inline on the only pool thread instead of deadlocking
+    assert pool.submit(pool.map, lambda i: i, [1, 2]).result(timeout=10) == [1, 2]
+
+    with pytest.raises(ZeroDivisionError):
+        pool.submit(pool.submit(lambda: 1 / 0).result).result(timeout=10)
+
+    pool.shutdown()
+    with pytest.raises(RuntimeError):
+        pool.submit(print)
+
+
+def test_random_str() -> None:
+    assert random_str() != random_str()
+    assert len(random_str(0)) == 0
+    expected = 1000
+    counts = Counter(random_str(len(string.ascii_letters) * expected))
+    assert set(counts) == set(string.ascii_letters)
+    # every letter is drawn with the same probability, within 5 sigma here
+    assert all(abs(count - expected) < 0.15 * expected for count in counts.values())
@@ -13,11 +13,22 @@
 # limitations under the License.
 
 """The module contains utility functions for the tosfs package."""
-import random
+import functools
+import os
+import queue
 import re
 import string
 import tempfile
-from typing import Generator, Tuple
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Generator, Iterable, List, Optional, Tuple
+
+from tosfs.consts import PATH_CACHE_MAX_SIZE
+
+# maps the byte values below 208 onto the 52 ASCII letters, 4 values each, the
+# others are rejected so that every letter is equally likely
+_RANDOM_LETTERS = (string.ascii_letters * 5)[:256].encode("ascii")
+_RANDOM_REJECTED = bytes(range(4 * len(string.ascii_letters), 256))
 
 
 def random_str(length: int = 5) -> str:
@@ -32,7 +43,13 @@ def random_str(length: int = 5) -> str:
     str: The random string.
 
     """
-    return "".join(random.choices(string.ascii_letters, k=length))
+    letters = b""
+    while len(letters) < length:
+        # about a fifth of the random bytes are rejected, ask for a bit more
+        letters += os.urandom(length + length // 4 + 1).translate(
+            _RANDOM_LETTERS, _RANDOM_REJECTED
+        )
+    return letters[:length].decode("ascii")
 
 
 def create_temp_dir() -> str:
@@ -46,6 +63,30 @@ def create_temp_dir() -> str:
     return tempfile.mkdtemp()
 
 
+_BUCKET_FORMATS = (
+    re.compile(
+        r"^(?P<bucket>:tos:[a-z\-0-9]*:[0-9]{12}:accesspoint[:/][^/]+)/?"
+        r"(?P<key>.*)$"
+    ),
+    re.compile(
+        r"^(?P<bucket>:tos-outposts:[a-z\-0-9]+:[0-9]{12}:outpost[/:]"
+        # pylint: disable=line-too-long
+        r"[a-zA-Z0-9\-]{1,63}[/:](bucket|accesspoint)[/:][a-zA-Z0-9\-]{1,63})[/:]?(?P<key>.*)$"
+    ),
+    re.compile(
+        r"^(?P<bucket>:tos-outposts:[a-z\-0-9]+:[0-9]{12}:outpost[/:]"
+        r"[a-zA-Z0-9\-]{1,63}[/:]bucket[/:]"
+        r"[a-zA-Z0-9\-]{1,63})[/:]?(?P<key>.*)$"
+    ),
+    re.compile(
+        r"^(?P<bucket>:tos-object-lambda:[a-z\-0-9]+:[0-9]{12}:"
+        r"accesspoint[/:][a-zA-Z0-9\-]{1,63})[/:]?(?P<key>.*)$"
+    ),
+    re.compile(r"^tos://(?P<bucket>[^/]+)/(?P<key>.*)$"),
+)
+
+
+@functools.lru_cache(maxsize=PATH_CACHE_MAX_SIZE)
 def find_bucket_key(tos_path: str) -> Tuple[str, str]:
     """It's a helper function to find bucket and key pair.
 
@@ -53,31 +94,12 @@ def find_bucket_key(tos_path: str) -> Tuple[str, str]:
     is of the form: bucket/key.
     It will return the bucket and the key represented by the tos path.
     """
-    bucket_format_list = [
-        re.compile(
-            r"^(?P<bucket>:tos:[a-z\-0-9]*:[0-9]{12}:accesspoint[:/][^/]+)/?"
-            r"(?P<key>.*)$"
-        ),
-        re.compile(
-            r"^(?P<bucket>:tos-outposts:[a-z\-0-9]+:[0-9]{12}:outpost[/:]"
-            # pylint: disable=line-too-long
-            r"[a-zA-Z0-9\-]{1,63}[/:](bucket|accesspoint)[/:][a-zA-Z0-9\-]{1,63})[/:]?(?P<key>.*)$"
-        ),
-        re.compile(
-            r"^(?P<bucket>:tos-outposts:[a-z\-0-9]+:[0-9]{12}:outpost[/:]"
-            r"[a-zA-Z0-9\-]{1,63}[/:]bucket[/:]"
-            r"[a-zA-Z0-9\-]{1,63})[/:]?(?P<key>.*)$"
-        ),
-        re.compile(
-            r"^(?P<bucket>:tos-object-lambda:[a-z\-0-9]+:[0-9]{12}:"
-            r"accesspoint[/:][a-zA-Z0-9\-]{1,63})[/:]?(?P<key>.*)$"
-        ),
-        re.compile(r"^tos://(?P<bucket>[^/]+)/(?P<key>.*)$"),
-    ]
-    for bucket_format in bucket_format_list:
-        match = bucket_format.match(tos_path)
-        if match:
-            return match.group("bucket"), match.group("key")
+    # every special format starts with one of these, plain paths skip the regexes
+    if tos_path.startswith((":", "tos://")):
+        for bucket_format in _BUCKET_FORMATS:
+            match = bucket_format.match(tos_path)
+            if match:
+                return match.group("bucket"), match.group("key")
     tos_components = tos_path.split("/", 1)
     bucket = tos_components[0]
     tos_key = ""
@@ -86,6 +108,12 @@ def find_bucket_key(tos_path: str) -> Tuple[str, str]:
     return bucket, tos_key
 
 
+@functools.lru_cache(maxsize=PATH_CACHE_MAX_SIZE)
+def canonical_dir(path: str) -> str:
+    """Return the path with exactly one trailing slash, as a directory key."""
+    return path.rstrip("/") + "/"
+
+
 def get_brange(size: int, block: int) -> Generator[Tuple[int, int], None, None]:
     """Chunk up a file into zero-based byte ranges.
 
@@ -99,3 +127,199 @@ def get_brange(size: int, block: int) -> Generator[Tuple[int, int], None, None]:
     """
     for offset in range(0, size, block):
         yield offset, min(offset + block - 1, size - 1)
+
+
+def get_part_ranges(
+    size: int, total_parts: int, part_size: int
+) -> Generator[Tuple[int, int, int], None, None]:
+    """Split a file into numbered, inclusive byte ranges of at most part_size.
+
+    Parameters
+    ----------
+    size : int
+        file size
+    total_parts : int
+        number of parts to yield, numbered from 1
+    part_size : int
+        maximum size of each part
+
+    """
+    offset = 0
+    for part_number in range(1, total_parts + 1):
+        length = min(size - offset, part_size)
+        yield part_number, offset, offset + length - 1
+        offset += length
+
+
+# serializes the seek and write pairs where os.pwrite is missing (Windows)
+_pwrite_lock = threading.Lock()
+
+
+def pwrite_all(fd: int, data: bytes, offset: int) -> None:
+    """Write all of data at the offset of fd, resuming after short writes.
+
+    Without os.pwrite, the writes seek then write under a lock shared by all
+    the callers instead.
+    """
+    view = memoryview(data)
+    if not hasattr(os, "pwrite"):
+        with _pwrite_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while view:
+                view = view[os.write(fd, view) :]
+        return
+
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def pipe_chunks(
+    body: BinaryIO, write: Callable[[bytes], Any], chunk_size: int, depth: int
+) -> int:
+    """Copy a stream chunk by chunk, reading ahead while the last chunk is written.
+
+    A reader thread keeps up to ``depth`` chunks queued, so the network read of
+    the next chunk overlaps the write of the current one. Errors from either
+    side are raised in the calling thread. From a thread of a shared pool,
+    e.g. a part worker running alongside the others, the chunks are copied
+    in turn without a reader thread, the overlap would buy nothing there.
+
+    Parameters
+    ----------
+    body : BinaryIO
+        stream to read from
+    write : Callable[[bytes], Any]
+        called with each chunk, in order
+    chunk_size : int
+        number of bytes per read
+    depth : int
+        maximum number of chunks read ahead
+
+    Returns
+    -------
+    int: The number of bytes copied.
+
+    """
+    if in_pool_thread():
+        return _copy_chunks(body, write, chunk_size)
+    return _copy_chunks_read_ahead(body, write, chunk_size, depth)
+
+
+def _copy_chunks_read_ahead(
+    body: BinaryIO, write: Callable[[bytes], Any], chunk_size: int, depth: int
+) -> int:
+    chunks: queue.Queue = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def _read() -> None:
+        try:
+            while not stopped.is_set():
+                chunk = body.read(chunk_size)
+                chunks.put(chunk)
+                if not chunk:
+                    return
+        except BaseException as e:
+            chunks.put(e)
+
+    reader = threading.Thread(target=_read, daemon=True)
+    reader.start()
+    copied = 0
+    try:
+        while True:
+            chunk = chunks.get()
+            if isinstance(chunk, BaseException):
+                raise chunk
+            if not chunk:
+                return copied
+            write(chunk)
+            copied += len(chunk)
+    finally:
+        stopped.set()
+        # unblock a reader waiting on a full queue so it can notice the stop
+        while reader.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def _copy_chunks(body: BinaryIO, write: Callable[[bytes], Any], chunk_size: int) -> int:
+    copied = 0
+    while True:
+        chunk = body.read(chunk_size)
+        if not chunk:
+            return copied
+        write(chunk)
+        copied += len(chunk)
+
+
+# marks the threads of the shared pools
+_pool_thread = threading.local()
+
+
+def _mark_pool_thread() -> None:
+    _pool_thread.active = True
+
+
+def in_pool_thread() -> bool:
+    """Return whether the calling thread belongs to a shared pool."""
+    return getattr(_pool_thread, "active", False)
+
+
+class SharedThreadPool:
+    """A thread pool created on first use, and again in a forked child.
+
+    Work submitted from a thread of any shared pool runs inline instead, as
+    waiting on a saturated pool from one of its own threads would deadlock.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str) -> None:
+        """Instantiate a SharedThreadPool object."""
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """The underlying executor, (re)created as needed."""
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=self.thread_name_prefix,
+                        initializer=_mark_pool_thread,
+                    )
+                    self._pid = pid
+        return self._executor
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """Submit func to the pool, or run it inline from a pool thread."""
+        if not in_pool_thread():
+            return self.executor.submit(func, *args)
+
+        future: Future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def map(self, func: Callable[..., Any], iterable: Iterable) -> List[Any]:
+        """Return func applied to every item, computed concurrently."""
+        futures = [self.submit(func, item) for item in iterable]
+        try:
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self) -> None:
+        """Shut the pool down without waiting, cancelling the queued work."""
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)